@@ -0,0 +1,143 @@
+# Leap Time Tracker - batch.py (headless team balances)
+#
+# Computes the balance for every active user in a Harvest account without the
+# UI. Users are listed through /v2/users, their time entries are fetched
+# concurrently under the token's shared harvest rate limiter, and balances are
+# computed in a process pool with the same ledger as the app. Leave is not
+# known here, so balances cover logged versus contractual hours only. A user
+# whose entries cannot be fetched gets an error in the report instead of
+# stopping the run.
+#
+#   python batch.py --from 2025-01-01 --to 2025-12-31 -o balances.csv
+#
+# The token and account id are read from HARVEST_ACCESS_TOKEN and
+# HARVEST_ACCOUNT_ID unless given on the command line. Per-stage timings are
+# written next to the report as <output>.timings.json.
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import harvest
+from entry_cache import get_time_entries
+from leave_store import LeaveStore
+from ledger import WEEKDAYS, balance_summary, build_ledger
+
+def parse_hours(text):
+    values = [float(v) for v in text.split(",")]
+    if len(values) != 7:
+        raise argparse.ArgumentTypeError("expected seven comma-separated values, Monday first")
+    return dict(zip(WEEKDAYS, values))
+
+def parse_args(argv):
+    today = datetime.date.today()
+    parser = argparse.ArgumentParser(description="Compute hours balances for every user in a Harvest account.")
+    parser.add_argument("--token", default=os.environ.get("HARVEST_ACCESS_TOKEN"))
+    parser.add_argument("--account", default=os.environ.get("HARVEST_ACCOUNT_ID"))
+    parser.add_argument("--from", dest="start", type=datetime.date.fromisoformat, default=today.replace(day=1))
+    parser.add_argument("--to", dest="end", type=datetime.date.fromisoformat, default=today)
+    parser.add_argument("--hours", type=parse_hours, default=parse_hours("7.5,7.5,7.5,7.5,7.5,0,0"),
+                        help="standard daily hours Monday..Sunday, comma-separated")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes computing balances")
+    parser.add_argument("--cache", action="store_true", help="read entries through the on-disk entry cache")
+    parser.add_argument("-o", "--output", default="balances.csv", help="report path (.csv or .parquet)")
+    args = parser.parse_args(argv)
+    if not (args.token and args.account):
+        parser.error("a Harvest token and account id are required")
+    if args.start > args.end:
+        parser.error("--from must not be after --to")
+    return args
+
+def list_users(api_token, account_id):
+    return harvest.fetch_all_pages("/users", "users", api_token, account_id, {"is_active": "true"})
+
+# (entries or None, seconds, error message or None)
+def fetch_user_entries(user, args):
+    started = time.perf_counter()
+    fetch = get_time_entries if args.cache else harvest.fetch_time_entries
+    try:
+        entries = fetch(args.start, args.end, user["id"], args.token, args.account)
+    except Exception as e:
+        return None, time.perf_counter() - started, str(e) or type(e).__name__
+    return entries, time.perf_counter() - started, None
+
+def compute_balance(job):
+    start, end, daily_hours, entries = job
+    started = time.perf_counter()
+    summary = balance_summary(build_ledger(start, end, daily_hours, LeaveStore(), entries))
+    return summary, time.perf_counter() - started
+
+def write_report(rows, path):
+    import pandas as pd
+    df = pd.DataFrame(rows)
+    # Failed users leave gaps; keep the count an integer column
+    df["entries"] = df["entries"].astype("Int64")
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+def write_timings(timings, rows, args):
+    with open(f"{args.output}.timings.json", "w") as f:
+        json.dump({
+            "from": args.start.isoformat(),
+            "to": args.end.isoformat(),
+            "users": len(rows),
+            "failed": sum(1 for row in rows if row["error"]),
+            "seconds": {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        }, f, indent=2)
+
+def main(argv=None):
+    args = parse_args(argv)
+    timings = {}
+
+    started = time.perf_counter()
+    users = list_users(args.token, args.account)
+    timings["list_users"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=harvest.MAX_WORKERS) as pool:
+        fetched = list(pool.map(lambda user: fetch_user_entries(user, args), users))
+    timings["fetch"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    jobs = [(args.start, args.end, args.hours, entries) for entries, _, error in fetched if error is None]
+    results = iter([])
+    if jobs:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = iter(list(pool.map(compute_balance, jobs, chunksize=max(1, len(jobs) // (args.workers * 4)))))
+    timings["compute"] = time.perf_counter() - started
+
+    rows = []
+    for user, (entries, fetch_seconds, error) in zip(users, fetched):
+        summary, compute_seconds = next(results) if error is None else ({}, None)
+        rows.append({
+            "user_id": user["id"],
+            "name": f"{user.get('first_name', '')} {user.get('last_name', '')}".strip(),
+            "email": user.get("email"),
+            "from": args.start.isoformat(),
+            "to": args.end.isoformat(),
+            "entries": len(entries) if entries is not None else None,
+            "logged_hours": summary.get("logged"),
+            "expected_hours": summary.get("expected"),
+            "balance": summary.get("balance"),
+            "fetch_seconds": round(fetch_seconds, 4),
+            "compute_seconds": round(compute_seconds, 6) if compute_seconds is not None else None,
+            "error": error
+        })
+    started = time.perf_counter()
+    write_report(rows, args.output)
+    timings["write"] = time.perf_counter() - started
+    write_timings(timings, rows, args)
+
+    failed = sum(1 for row in rows if row["error"])
+    print(f"{len(rows)} users written to {args.output}" + (f" ({failed} failed)" if failed else ""), file=sys.stderr)
+    for stage, seconds in timings.items():
+        print(f"  {stage:<10} {seconds:8.2f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# Leap Time Tracker - benchmarks/fake_harvest.py (local Harvest API stand-in)
+#
+# Serves synthetic /v2/users/me, /v2/users, paginated /v2/time_entries and
+# /v2/reports/time/team responses shaped like Harvest's, with configurable
+# history length, page size cap, per-request latency and 429 injection. The
+# report can be refused with another status or leave out some users' rows.
+# Used by benchmarks/run.py and the tests; point harvest.API_URL at
+# FakeHarvest.url to use it.
+
+import datetime
+import json
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+def synthetic_entries(days, end=None, per_day=2, first_id=1):
+    end = end or datetime.date.today()
+    entries = []
+    next_id = first_id
+    for offset in range(days):
+        day = end - datetime.timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for i in range(per_day):
+            spent = day.isoformat()
+            entries.append({
+                "id": next_id,
+                "spent_date": spent,
+                "hours": 3.75 + 0.25 * ((next_id * 7) % 5),
+                "rounded_hours": 4.0,
+                "notes": "Synthetic entry for benchmarking",
+                "is_locked": False,
+                "is_running": False,
+                "is_billed": False,
+                "billable": True,
+                "budgeted": False,
+                "billable_rate": 100.0,
+                "cost_rate": 50.0,
+                "created_at": f"{spent}T09:00:00Z",
+                "updated_at": f"{spent}T17:00:00Z",
+                "user": {"id": 1, "name": "Bench User"},
+                "client": {"id": 10, "name": "Client", "currency": "GBP"},
+                "project": {"id": 100 + i, "name": "Project", "code": "PRJ"},
+                "task": {"id": 1000 + i, "name": "Development"},
+                "user_assignment": {"id": 5, "is_project_manager": False, "is_active": True},
+                "task_assignment": {"id": 6, "billable": True, "is_active": True},
+                "invoice": None,
+                "external_reference": None
+            })
+            next_id += 1
+    return entries     # newest first, like Harvest
+
+class FakeHarvest:
+    def __init__(self, history_days=365, per_day=2, users=1, max_per_page=2000,
+                 latency=0.0, rate_limit_every=0, retry_after=1, report_status=200, unreported_users=()):
+        self.entries = synthetic_entries(history_days, per_day=per_day)
+        # Ascending dates for range lookups; entries are stored newest first
+        self._dates = [e["spent_date"] for e in reversed(self.entries)]
+        self.users = [{"id": i + 1, "first_name": "Bench", "last_name": str(i + 1),
+                       "email": f"bench{i + 1}@example.com", "is_active": True} for i in range(users)]
+        self.max_per_page = max_per_page
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.report_status = report_status
+        self.unreported_users = set(unreported_users)
+        self.requests = 0
+        self.report_requests = 0
+        self.rate_limited = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    # Replace the served history, e.g. to edit, move or delete entries in tests
+    def set_entries(self, entries):
+        with self._lock:
+            self.entries = sorted(entries, key=lambda e: (e["spent_date"], e["id"]), reverse=True)
+            self._dates = [e["spent_date"] for e in reversed(self.entries)]
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/v2"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.report_requests = self.rate_limited = self.bytes_sent = 0
+
+    def _time_entries(self, query):
+        lo = bisect_left(self._dates, query.get("from", "0000-00-00"))
+        hi = bisect_right(self._dates, query.get("to", "9999-99-99"))
+        total = len(self._dates)
+        entries = self.entries[total - hi:total - lo]
+        if "updated_since" in query:
+            entries = [e for e in entries if e["updated_at"] > query["updated_since"]]
+        per_page = min(int(query.get("per_page", 2000)), self.max_per_page)
+        page = int(query.get("page", 1))
+        total_pages = max(1, -(-len(entries) // per_page))
+        return {
+            "time_entries": entries[(page - 1) * per_page:page * per_page],
+            "per_page": per_page,
+            "total_pages": total_pages,
+            "total_entries": len(entries),
+            "next_page": page + 1 if page < total_pages else None,
+            "previous_page": page - 1 if page > 1 else None,
+            "page": page
+        }
+
+    # Every user shares the synthetic history, so they all report the same total
+    def _team_report(self, query):
+        first = datetime.datetime.strptime(query["from"], "%Y%m%d").date().isoformat()
+        last = datetime.datetime.strptime(query["to"], "%Y%m%d").date().isoformat()
+        lo = bisect_left(self._dates, first)
+        hi = bisect_right(self._dates, last)
+        total = len(self._dates)
+        hours = sum(e["hours"] for e in self.entries[total - hi:total - lo])
+        results = [{"user_id": u["id"], "user_name": f"{u['first_name']} {u['last_name']}",
+                    "is_contractor": False, "total_hours": hours, "billable_hours": hours,
+                    "currency": "GBP", "billable_amount": hours * 100.0}
+                   for u in self.users if u["id"] not in self.unreported_users]
+        return {"results": results, "per_page": 2000, "total_pages": 1, "total_entries": len(results),
+                "next_page": None, "previous_page": None, "page": 1}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=()):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+                with fake._lock:
+                    fake.bytes_sent += len(data)
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                    limited = fake.rate_limit_every and fake.requests % fake.rate_limit_every == 0
+                    if limited:
+                        fake.rate_limited += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if limited:
+                    return self._send(429, {"message": "Too Many Requests"}, [("Retry-After", str(fake.retry_after))])
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/v2/users/me":
+                    return self._send(200, fake.users[0])
+                if url.path == "/v2/users":
+                    return self._send(200, {"users": fake.users, "total_pages": 1, "next_page": None})
+                if url.path == "/v2/time_entries":
+                    return self._send(200, fake._time_entries(query))
+                if url.path == "/v2/reports/time/team":
+                    with fake._lock:
+                        fake.report_requests += 1
+                    if fake.report_status != 200:
+                        return self._send(fake.report_status, {"message": "Report refused"})
+                    return self._send(200, fake._team_report(query))
+                self._send(404, {"message": "Not found"})
+
+        return Handler
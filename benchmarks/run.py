@@ -0,0 +1,233 @@
+# Leap Time Tracker - benchmarks/run.py (benchmark suite)
+#
+# Times the fetch and compute paths against a local FakeHarvest server at
+# 1 month, 1 year and 5 years of history plus a team-sized batch, and the cold
+# start of the app in a fresh interpreter. Results are written as JSON so runs
+# from different versions can be compared:
+#
+#   python -m benchmarks.run -o bench.json
+#   python -m benchmarks.run --compare bench.json
+#
+# Each measured fetch starts with a fresh rate limiter, so timings reflect one
+# user action rather than the leftovers of earlier benchmarks.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import harvest
+from benchmarks.fake_harvest import FakeHarvest
+from charts import cumulative_chart_data, hours_chart_data
+from leave_store import LeaveStore, parse_xero_holidays
+from ledger import WEEKDAYS, balance_summary, build_ledger
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold start in a fresh interpreter: imports plus the first script run, which
+# ends at the credentials form when no token has been entered
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+AppTest.from_file("main_gui.py").run(timeout=60)
+print(json.dumps({"seconds": time.perf_counter() - started,
+                  "loads_pandas": "pandas" in sys.modules, "loads_altair": "altair" in sys.modules}))
+"""
+
+IMPORT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import bootstrap, entry_cache, harvest, instrumentation, leave_store, ledger
+print(json.dumps({"seconds": time.perf_counter() - started}))
+"""
+
+SIZES = {"1_month": 31, "1_year": 365, "5_years": 5 * 365 + 1}
+DAILY_HOURS = {day: 7.5 for day in WEEKDAYS[:5]} | {"Saturday": 0.0, "Sunday": 0.0}
+
+def measure(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return result, {
+        "repeat": repeat,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times)
+    }
+
+# Peak Python heap allocation during one call
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def fresh_limiter():
+    harvest.reset_rate_limiters()
+
+def synthetic_xero(days, end):
+    # Roughly a dozen leave requests a year, one to five days long
+    lines = []
+    for i in range(max(1, days * 12 // 365)):
+        last = end - datetime.timedelta(days=i * 30)
+        first = last - datetime.timedelta(days=i % 5)
+        lines.append(f"Holiday\tAnnual leave {i}\t{first:%d %b} - {last:%d %b %Y}\tApproved")
+    return "\n".join(lines)
+
+def leave_for(days, end):
+    store = LeaveStore()
+    for desc, start, stop in parse_xero_holidays(synthetic_xero(days, end)):
+        store.add(start, stop, desc)
+    return store
+
+def bench_size(name, days, args, results):
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=days - 1)
+    with FakeHarvest(history_days=days, max_per_page=args.page_size, latency=args.latency,
+                     rate_limit_every=args.inject_429) as fake:
+        harvest.API_URL = fake.url
+        fake.reset_counters()
+
+        def fetch():
+            fresh_limiter()
+            return harvest.fetch_time_entries(start, end, 1, "token", "account")
+
+        entries, stats = measure(fetch, args.repeat)
+        requests, bytes_sent, rate_limited = fake.requests, fake.bytes_sent, fake.rate_limited
+        results.append({"benchmark": "fetch_time_entries", "size": name, "days": days, "entries": len(entries),
+                        "requests": requests // args.repeat, "bytes": bytes_sent // args.repeat,
+                        "rate_limited": rate_limited // args.repeat, "peak_bytes": peak_memory(fetch),
+                        "result_bytes": entries.nbytes, **stats})
+
+        # The balance total alone, from the time reports instead of the entries
+        fake.reset_counters()
+
+        def fetch_report():
+            fresh_limiter()
+            return harvest.fetch_reported_hours(start, end, 1, "token", "account")
+
+        _, stats = measure(fetch_report, args.repeat)
+        results.append({"benchmark": "fetch_reported_hours", "size": name, "days": days,
+                        "requests": fake.requests // args.repeat, "bytes": fake.bytes_sent // args.repeat,
+                        "rate_limited": fake.rate_limited // args.repeat, **stats})
+
+    holidays = leave_for(days, end)
+    _, stats = measure(lambda: balance_summary(build_ledger(start, end, DAILY_HOURS, holidays, entries)), args.repeat)
+    results.append({"benchmark": "calculate_balance", "size": name, "days": days, "entries": len(entries), **stats})
+
+    ledger = build_ledger(start, end, DAILY_HOURS, holidays, entries)
+    _, stats = measure(lambda: hours_chart_data(ledger), args.repeat)
+    results.append({"benchmark": "hours_chart_data", "size": name, "days": days, **stats})
+    _, stats = measure(lambda: cumulative_chart_data(ledger), args.repeat)
+    results.append({"benchmark": "cumulative_chart_data", "size": name, "days": days, **stats})
+
+    text = synthetic_xero(days, end)
+    parsed, stats = measure(lambda: parse_xero_holidays(text), args.repeat)
+    results.append({"benchmark": "parse_xero_holidays", "size": name, "days": days, "lines": len(parsed), **stats})
+
+def bench_team(args, results):
+    days = 365
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=days - 1)
+    with FakeHarvest(history_days=days, users=args.team_users, max_per_page=args.page_size,
+                     latency=args.latency, rate_limit_every=args.inject_429) as fake:
+        harvest.API_URL = fake.url
+        fake.reset_counters()
+
+        def team():
+            fresh_limiter()
+            users = harvest.fetch_all_pages("/users", "users", "token", "account", {"is_active": "true"})
+            with ThreadPoolExecutor(max_workers=harvest.MAX_WORKERS) as pool:
+                fetched = list(pool.map(
+                    lambda user: harvest.fetch_time_entries(start, end, user["id"], "token", "account"), users))
+            return [balance_summary(build_ledger(start, end, DAILY_HOURS, LeaveStore(), e)) for e in fetched]
+
+        balances, stats = measure(team, args.repeat)
+        results.append({"benchmark": "team_balances", "size": f"{args.team_users}_users_1_year", "days": days,
+                        "users": len(balances), "requests": fake.requests // args.repeat,
+                        "bytes": fake.bytes_sent // args.repeat, "rate_limited": fake.rate_limited // args.repeat,
+                        **stats})
+
+def bench_startup(args, results):
+    for name, script in [("app_module_imports", IMPORT_SCRIPT), ("first_render", STARTUP_SCRIPT)]:
+        runs = []
+        for _ in range(args.repeat):
+            out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        times = [r.pop("seconds") for r in runs]
+        results.append({"benchmark": "startup", "size": name, **runs[-1], "repeat": args.repeat,
+                        "min": min(times), "median": statistics.median(times), "mean": statistics.fmean(times)})
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"{'benchmark':<24} {'size':<22} {'before':>10} {'after':>10} {'ratio':>7}")
+    for r in results:
+        old = baseline.get((r["benchmark"], r["size"]))
+        if old is None:
+            continue
+        ratio = r["median"] / old["median"] if old["median"] else float("inf")
+        print(f"{r['benchmark']:<24} {r['size']:<22} {old['median']:>10.4f} {r['median']:>10.4f} {ratio:>7.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Leap Time Tracker against a local Harvest stand-in.")
+    parser.add_argument("-o", "--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="print median ratios against an earlier JSON result file")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--team-users", type=int, default=50, help="users in the team benchmark (0 to skip)")
+    parser.add_argument("--page-size", type=int, default=2000, help="largest page the fake server returns")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every fake response")
+    parser.add_argument("--no-startup", action="store_true", help="skip the cold start benchmarks")
+    parser.add_argument("--inject-429", type=int, default=0, metavar="N", help="answer every Nth request with 429")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.sizes:
+        bench_size(name, SIZES[name], args, results)
+    if args.team_users:
+        bench_team(args, results)
+    if not args.no_startup:
+        bench_startup(args, results)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "args": vars(args)
+        },
+        "results": results
+    }
+    if args.compare:
+        compare(results, args.compare)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
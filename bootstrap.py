@@ -0,0 +1,38 @@
+# Leap Time Tracker - bootstrap.py (cached credential bootstrap)
+#
+# Streamlit reruns the whole script on every interaction, so the lookups made
+# as soon as credentials are entered (user id, earliest and latest entry date)
+# are memoised per credential set. Entries are keyed by a hash of the token and
+# account id, expire after BOOTSTRAP_TTL seconds and can be dropped explicitly.
+# Failures are not cached.
+
+import hashlib
+import threading
+import time
+
+BOOTSTRAP_TTL = 15 * 60
+
+_cache = {}     # credentials key -> {name: (value, fetched_at)}
+_lock = threading.Lock()
+
+def credentials_key(api_token, account_id):
+    return hashlib.sha256(f"{account_id}\0{api_token}".encode()).hexdigest()
+
+def cached_call(api_token, account_id, name, fn, *args, ttl=BOOTSTRAP_TTL):
+    key = credentials_key(api_token, account_id)
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(key, {}).get(name)
+    if hit is not None and now - hit[1] < ttl:
+        return hit[0]
+    value = fn(*args)
+    with _lock:
+        # Drop expired credential sets so the cache does not grow without bound
+        for stale in [k for k, v in _cache.items() if all(now - t >= ttl for _, t in v.values())]:
+            del _cache[stale]
+        _cache.setdefault(key, {})[name] = (value, now)
+    return value
+
+def invalidate(api_token, account_id):
+    with _lock:
+        _cache.pop(credentials_key(api_token, account_id), None)
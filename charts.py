@@ -0,0 +1,98 @@
+# Leap Time Tracker - charts.py (graph data and Altair charts)
+#
+# Chart payloads are kept under a point budget: the hours graph moves from
+# daily to weekly, monthly or yearly buckets as the range grows, and the
+# cumulative graph is downsampled with Largest-Triangle-Three-Buckets, which
+# keeps the visible shape of each line.
+
+import os
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+MAX_CHART_POINTS = int(os.environ.get("TIMETRACKER_CHART_POINTS", 1000))
+
+# (label, pandas resample rule); None means one bar per day
+RESOLUTIONS = [
+    ("Daily", None),
+    ("Weekly", "W-MON"),
+    ("Monthly", "MS"),
+    ("Yearly", "YS"),
+]
+
+def _bucketed(ledger, max_points):
+    # Up to two rows per bucket: the contractual bar and overtime or shortfall
+    frame = pd.DataFrame({"expected": ledger.expected, "actual": ledger.actual}, index=pd.to_datetime(ledger.dates))
+    for label, rule in RESOLUTIONS:
+        if rule is None:
+            buckets = frame[frame["expected"] != 0]
+        else:
+            buckets = frame.resample(rule, label="left", closed="left").sum()
+            buckets = buckets[buckets["expected"] != 0]
+        if 2 * len(buckets) <= max_points or rule == RESOLUTIONS[-1][1]:
+            return label, buckets
+
+# Contractual bar per working day (or bucket) plus an overtime or shortfall bar on top
+def hours_chart_data(ledger, max_points=MAX_CHART_POINTS):
+    resolution, buckets = _bucketed(ledger, max_points)
+    dates = buckets.index
+    exp = buckets["expected"].to_numpy()
+    act = buckets["actual"].to_numpy()
+    over = act > exp
+    under = act < exp
+    frames = [
+        pd.DataFrame({"Date": dates, "Type": "Contractual Hours", "y0": 0.0, "y1": exp, "Value": exp}),
+        pd.DataFrame({"Date": dates[over], "Type": "Overtime", "y0": exp[over], "y1": act[over], "Value": act[over] - exp[over]}),
+        pd.DataFrame({"Date": dates[under], "Type": "Shortfall", "y0": act[under], "y1": exp[under], "Value": exp[under] - act[under]}),
+    ]
+    df = pd.concat(frames, ignore_index=True).sort_values("Date", kind="stable", ignore_index=True)
+    return df, resolution
+
+# Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y)
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        stop = int((i + 1) * every) + 1
+        next_stop = min(int((i + 2) * every) + 1, n)
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def cumulative_chart_data(ledger, max_points=MAX_CHART_POINTS):
+    dates = pd.to_datetime(ledger.dates)
+    x = ledger.dates.astype("int64").astype(float)
+    frames = []
+    for name, values in [("Contractual Hours", np.cumsum(ledger.expected)), ("Hours Worked", np.cumsum(ledger.actual))]:
+        keep = lttb(x, values, max_points // 2)
+        frames.append(pd.DataFrame({"Date": dates[keep], "Type": name, "Cumulative Hours": values[keep]}))
+    return pd.concat(frames, ignore_index=True)
+
+def hours_chart(df, resolution="Daily"):
+    color_scale = alt.Scale(domain=["Contractual Hours", "Overtime", "Shortfall"], range=["#2471A3", "#D7263D", "#21A179"])
+    return alt.Chart(df).mark_bar().encode(
+        x=alt.X("Date:T", title="Date", axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y("y0:Q", title="Hours"),
+        y2=alt.Y2("y1:Q"),
+        color=alt.Color("Type:N", scale=color_scale, legend=alt.Legend(title="Type")),
+        tooltip=["Date:T", "Type:N", alt.Tooltip("Value:Q", title="Hours")]
+    ).properties(title=f"Contractual, Overtime, and Shortfall Hours ({resolution})").configure_axis(labelFontSize=11)
+
+def cumulative_chart(df):
+    color_scale = alt.Scale(domain=["Hours Worked", "Contractual Hours"], range=["#29335C", "#E4572E"])
+    return alt.Chart(df).mark_line(point=True).encode(
+        x=alt.X("Date:T", title="Date"),
+        y=alt.Y("Cumulative Hours:Q", title="Cumulative Hours"),
+        color=alt.Color("Type:N", scale=color_scale, legend=alt.Legend(title="")),
+        tooltip=["Date:T", "Type:N", "Cumulative Hours:Q"]
+    ).properties(title="Cumulative Contractual vs Hours Worked")
@@ -0,0 +1,8 @@
+# Leap Time Tracker - conftest.py (pytest setup)
+#
+# Lets the tests under tests/ import the top-level modules.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
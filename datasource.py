@@ -0,0 +1,77 @@
+# Leap Time Tracker - datasource.py (choosing the cheapest Harvest query)
+#
+# The balance only needs the total hours logged over the range, which the
+# Harvest time reports return in one small response per year of range, while
+# the entries for a year run to hundreds of kilobytes. The graphs and the
+# balance explorer need hours per day, so they always use the time entries.
+# For the balance, "auto" estimates the requests each way, counting what the
+# on-disk cache already covers, and prefers the report on a tie since it
+# transfers far fewer bytes. Entries already prefetched cost nothing more.
+# A report that fails falls back to the entries; a 401/403 also tells the
+# caller to stop asking, since the token's role may not read reports.
+
+import math
+
+import requests
+
+from entry_cache import CACHE_PATH, cached_range
+from harvest import PER_PAGE, REPORT_SPAN_DAYS, ReportUnavailable, fetch_reported_hours
+
+SOURCES = {
+    "auto": "Automatic",
+    "entries": "Time entries",
+    "reports": "Reports API where possible",
+}
+
+# Requests made by a cached load whose range is already synced: the
+# updated_since query and the deletion count check
+CACHED_SYNC_REQUESTS = 2
+
+# Guess used to size a fetch of entries that are not cached yet
+ENTRIES_PER_DAY = 3
+
+def report_requests(start, end):
+    return math.ceil(((end - start).days + 1) / REPORT_SPAN_DAYS)
+
+def _entry_pages(days):
+    return max(1, math.ceil(days * ENTRIES_PER_DAY / PER_PAGE))
+
+# Requests a cached load of the range would make (see entry_cache.sync_time_entries)
+def entry_requests(start, end, user_id, account_id, path=CACHE_PATH):
+    covered = cached_range(user_id, account_id, path)
+    if covered is None:
+        return _entry_pages((end - start).days + 1)
+    requests = CACHED_SYNC_REQUESTS
+    if start < covered[0]:
+        requests += _entry_pages((covered[0] - start).days)
+    if end > covered[1]:
+        requests += _entry_pages((end - covered[1]).days)
+    return requests
+
+def balance_source(mode, start, end, user_id, account_id, prefetched=False, reports_allowed=True, path=CACHE_PATH):
+    if not reports_allowed:
+        return "entries"
+    if mode != "auto":
+        return mode
+    if prefetched:
+        # The entries are already fetched or on their way
+        return "entries"
+    if report_requests(start, end) <= entry_requests(start, end, user_id, account_id, path):
+        return "reports"
+    return "entries"
+
+# Returns (hours, denied): the reported hours logged over the range, or None
+# when the balance should come from the time entries, and whether Harvest
+# refused the report outright
+def balance_hours(mode, start, end, user_id, api_token, account_id, prefetched=False, reports_allowed=True,
+                  path=CACHE_PATH):
+    if balance_source(mode, start, end, user_id, account_id, prefetched, reports_allowed, path) != "reports":
+        return None, False
+    try:
+        return fetch_reported_hours(start, end, user_id, api_token, account_id), False
+    except requests.HTTPError as e:
+        # Not every Harvest role may read reports; other failures fall back just this once
+        return None, e.response is not None and e.response.status_code in (401, 403)
+    except ReportUnavailable:
+        # Not a total we can trust (see harvest.py); the entries give the right one
+        return None, False
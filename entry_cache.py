@@ -0,0 +1,173 @@
+# Leap Time Tracker - entry_cache.py (on-disk time entry cache)
+#
+# Keeps the date and hours of every time entry already fetched for an
+# account/user in SQLite, together with the date range that is known to be
+# complete. Later loads only ask Harvest for entries changed since the last
+# sync (updated_since) and fetch whatever part of the requested range is not
+# covered yet. Harvest has no feed of deleted entries, so a one-row count
+# request over the synced range detects deletions and triggers a resync.
+
+import datetime
+import os
+import sqlite3
+from contextlib import closing
+from itertools import repeat
+
+import numpy as np
+
+from entry_columns import TimeEntryColumns, day_number
+from harvest import count_time_entries, fetch_time_entries
+from instrumentation import span
+
+CACHE_PATH = os.environ.get(
+    "TIMETRACKER_CACHE",
+    os.path.join(os.path.expanduser("~"), ".timetracker", "entries.sqlite")
+)
+
+# The next sync asks for changes since this long before the last one started,
+# so edits made in the same second or under clock skew against Harvest are
+# not missed. Re-applying an unchanged entry is harmless.
+SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS time_entries (
+    account_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    spent_date TEXT NOT NULL,
+    hours REAL NOT NULL,
+    PRIMARY KEY (account_id, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS time_entries_by_date ON time_entries (account_id, user_id, spent_date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    account_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    range_from TEXT NOT NULL,
+    range_to TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (account_id, user_id)
+);
+"""
+
+def connect(path=CACHE_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+def _day(iso_date):
+    return day_number(datetime.date.fromisoformat(iso_date))
+
+def _sync_cutoff():
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - SYNC_OVERLAP
+    return cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _upsert(conn, account_id, user_id, entries, range_from, range_to):
+    inside = (entries.days >= _day(range_from)) & (entries.days <= _day(range_to))
+    kept = entries.take(inside)
+    conn.executemany("INSERT OR REPLACE INTO time_entries VALUES (?, ?, ?, ?, ?)", zip(
+        repeat(account_id), repeat(user_id),
+        kept.ids.tolist(), np.datetime_as_string(kept.spent_dates()).tolist(), kept.hours.tolist()
+    ))
+    # Entries moved outside the synced range
+    conn.executemany("DELETE FROM time_entries WHERE account_id = ? AND user_id = ? AND id = ?", zip(
+        repeat(account_id), repeat(user_id), entries.ids[~inside].tolist()
+    ))
+
+def _local_ids(conn, account_id, user_id, range_from, range_to):
+    return {row[0] for row in conn.execute(
+        "SELECT id FROM time_entries WHERE account_id = ? AND user_id = ? AND spent_date BETWEEN ? AND ?",
+        (account_id, user_id, range_from, range_to)
+    )}
+
+def _fetch_range(account_id, user_id, api_token, range_from, range_to):
+    return fetch_time_entries(
+        datetime.date.fromisoformat(range_from), datetime.date.fromisoformat(range_to),
+        user_id, api_token, account_id
+    )
+
+# Every session shares the database file, so all Harvest requests are made
+# first and the changes are then written in one short transaction; a write
+# lock held across a multi-year fetch would lock every other user out.
+def sync_time_entries(conn, start, end, user_id, api_token, account_id):
+    start = _as_date(start).isoformat()
+    end = _as_date(end).isoformat()
+    # Taken before any request so changes made while syncing are picked up next time
+    synced_at = _sync_cutoff()
+    state = conn.execute(
+        "SELECT range_from, range_to, synced_at FROM sync_state WHERE account_id = ? AND user_id = ?",
+        (account_id, user_id)
+    ).fetchone()
+    writes = []     # (replace range first, entries, range_from, range_to), applied in order
+    if state is None:
+        range_from, range_to = start, end
+        writes.append((True, _fetch_range(account_id, user_id, api_token, start, end), start, end))
+    else:
+        range_from, range_to, last_synced = state
+        changed = fetch_time_entries(None, None, user_id, api_token, account_id, updated_since=last_synced)
+        writes.append((False, changed, range_from, range_to))
+        # Ids the range will hold once the changes are applied
+        ids = _local_ids(conn, account_id, user_id, range_from, range_to)
+        inside = (changed.days >= _day(range_from)) & (changed.days <= _day(range_to))
+        ids.update(changed.ids[inside].tolist())
+        ids.difference_update(changed.ids[~inside].tolist())
+        if len(ids) != count_time_entries(
+                datetime.date.fromisoformat(range_from), datetime.date.fromisoformat(range_to),
+                user_id, api_token, account_id):
+            # Something was deleted on the Harvest side
+            writes.append((True, _fetch_range(account_id, user_id, api_token, range_from, range_to),
+                           range_from, range_to))
+        if start < range_from:
+            before = (datetime.date.fromisoformat(range_from) - datetime.timedelta(days=1)).isoformat()
+            writes.append((True, _fetch_range(account_id, user_id, api_token, start, before), start, before))
+            range_from = start
+        if end > range_to:
+            after = (datetime.date.fromisoformat(range_to) + datetime.timedelta(days=1)).isoformat()
+            writes.append((True, _fetch_range(account_id, user_id, api_token, after, end), after, end))
+            range_to = end
+    with conn:
+        for replace, entries, lo, hi in writes:
+            if replace:
+                conn.execute(
+                    "DELETE FROM time_entries WHERE account_id = ? AND user_id = ? AND spent_date BETWEEN ? AND ?",
+                    (account_id, user_id, lo, hi)
+                )
+            _upsert(conn, account_id, user_id, entries, lo, hi)
+        conn.execute(
+            "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?)",
+            (account_id, user_id, range_from, range_to, synced_at)
+        )
+
+# Cached replacement for harvest.fetch_time_entries, returning TimeEntryColumns
+def get_time_entries(start, end, user_id, api_token, account_id, path=CACHE_PATH):
+    with span("get_time_entries"), closing(connect(path)) as conn:
+        with span("entry cache sync"):
+            sync_time_entries(conn, start, end, user_id, api_token, account_id)
+        rows = conn.execute(
+            "SELECT id, CAST(julianday(spent_date) - julianday('1970-01-01') AS INTEGER), hours FROM time_entries "
+            "WHERE account_id = ? AND user_id = ? AND spent_date BETWEEN ? AND ? ORDER BY spent_date",
+            (account_id, user_id, _as_date(start).isoformat(), _as_date(end).isoformat())
+        ).fetchall()
+    if not rows:
+        return TimeEntryColumns.empty()
+    ids, days, hours = zip(*rows)
+    return TimeEntryColumns(np.array(ids, np.int64), np.array(days, np.int32), np.array(hours, np.float32))
+
+# (first, last) date fully synced for the user, or None
+def cached_range(user_id, account_id, path=CACHE_PATH):
+    with closing(connect(path)) as conn:
+        row = conn.execute(
+            "SELECT range_from, range_to FROM sync_state WHERE account_id = ? AND user_id = ?",
+            (account_id, user_id)
+        ).fetchone()
+    return (datetime.date.fromisoformat(row[0]), datetime.date.fromisoformat(row[1])) if row else None
+
+def clear_time_entries(user_id, account_id, path=CACHE_PATH):
+    with closing(connect(path)) as conn:
+        conn.execute("DELETE FROM time_entries WHERE account_id = ? AND user_id = ?", (account_id, user_id))
+        conn.execute("DELETE FROM sync_state WHERE account_id = ? AND user_id = ?", (account_id, user_id))
+        conn.commit()
@@ -0,0 +1,67 @@
+# Leap Time Tracker - entry_columns.py (compact time entry storage)
+#
+# Harvest returns every time entry with its user, client, project, task and
+# invoice objects attached, but only the date and hours are ever used. Each
+# page is projected into typed NumPy columns as soon as it is decoded and the
+# JSON is dropped, so memory scales with the entry count, not the payload.
+
+import datetime
+
+import numpy as np
+
+EPOCH = datetime.date(1970, 1, 1)
+
+def day_number(value):
+    return (value - EPOCH).days
+
+class TimeEntryColumns:
+    def __init__(self, ids, days, hours):
+        self.ids = ids          # int64 Harvest entry id
+        self.days = days        # int32 spent_date as days since 1970-01-01
+        self.hours = hours      # float32
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.days.nbytes + self.hours.nbytes
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.float32))
+
+    # Projection of one page of Harvest time entry JSON
+    @classmethod
+    def from_entries(cls, entries):
+        n = len(entries)
+        return cls(
+            np.fromiter((e["id"] for e in entries), np.int64, n),
+            np.array([e["spent_date"] for e in entries], dtype="datetime64[D]").astype(np.int32),
+            np.fromiter((e["hours"] for e in entries), np.float32, n)
+        )
+
+    @classmethod
+    def concat(cls, chunks):
+        chunks = [c for c in chunks if len(c)]
+        if not chunks:
+            return cls.empty()
+        if len(chunks) == 1:
+            return chunks[0]
+        return cls(
+            np.concatenate([c.ids for c in chunks]),
+            np.concatenate([c.days for c in chunks]),
+            np.concatenate([c.hours for c in chunks])
+        )
+
+    # Marks the arrays read-only so one copy can be shared between sessions
+    def read_only(self):
+        for column in (self.ids, self.days, self.hours):
+            column.flags.writeable = False
+        return self
+
+    def take(self, mask):
+        return TimeEntryColumns(self.ids[mask], self.days[mask], self.hours[mask])
+
+    def spent_dates(self):
+        return self.days.astype("datetime64[D]")
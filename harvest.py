@@ -0,0 +1,249 @@
+# Leap Time Tracker - harvest.py (Harvest API helpers)
+#
+# All requests go through one pooled requests.Session. Harvest's limit of 100
+# requests per 15 seconds applies per access token, so each account/token pair
+# gets its own token bucket and one user's long sync does not throttle the
+# other sessions on the server. A 429 response pauses that bucket for the
+# Retry-After period and the request is retried. Paginated endpoints read
+# total_pages from the first response and fetch the remaining pages in
+# parallel.
+
+import contextvars
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bootstrap import credentials_key
+from entry_columns import TimeEntryColumns
+from instrumentation import count, span, submit_in_context
+
+API_URL = "https://api.harvestapp.com/api/v2"
+MAX_WORKERS = 8
+# Page fetches run MAX_WORKERS at a time inside callers that are concurrent
+# themselves (batch users, report chunks, other sessions), so the connection
+# pool keeps enough sockets for both levels instead of discarding them
+POOL_SIZE = MAX_WORKERS * MAX_WORKERS
+MAX_RETRIES = 5
+PER_PAGE = 2000
+REPORT_SPAN_DAYS = 365     # the Reports API answers at most a year per request
+
+# A burst of half the limit plus a refill of the other half per window: any
+# `per` seconds see at most `limit` requests (capacity + fill_rate * per).
+class TokenBucket:
+    def __init__(self, limit=100, per=15.0):
+        self.capacity = limit // 2
+        self.tokens = float(self.capacity)
+        self.fill_rate = (limit - self.capacity) / per
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.blocked_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.fill_rate
+                else:
+                    wait = self.blocked_until - now
+            time.sleep(wait)
+
+    # Called on a 429: nobody sends until the server says so
+    def pause(self, seconds):
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = self.blocked_until
+
+    def idle(self, now):
+        with self.lock:
+            return now >= self.blocked_until and now - self.updated >= self.capacity / self.fill_rate
+
+_rate_limiters = {}     # credentials key -> TokenBucket
+_rate_limiters_lock = threading.Lock()
+
+def rate_limiter(api_token, account_id):
+    key = credentials_key(api_token, account_id)
+    with _rate_limiters_lock:
+        bucket = _rate_limiters.get(key)
+        if bucket is None:
+            # Buckets idle long enough to have refilled hold no state worth keeping
+            now = time.monotonic()
+            for stale in [k for k, b in _rate_limiters.items() if b.idle(now)]:
+                del _rate_limiters[stale]
+            bucket = _rate_limiters[key] = TokenBucket()
+        return bucket
+
+def reset_rate_limiters():
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
+
+class FetchCancelled(Exception):
+    pass
+
+# The team report has no row for the user, e.g. a manager's report that does
+# not cover them, so it cannot give their total
+class ReportUnavailable(Exception):
+    pass
+
+# Event checked before every request made in this context (see cancellable)
+_cancel_event = contextvars.ContextVar("cancel_event", default=None)
+
+# Requests made inside the block raise FetchCancelled once `event` is set
+@contextmanager
+def cancellable(event):
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+
+def harvest_headers(api_token, account_id):
+    return {
+        "Harvest-Account-ID": account_id,
+        "Authorization": f"Bearer {api_token}",
+        "User-Agent": "Harvest API Example"
+    }
+
+def _retry_after(resp, attempt):
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return min(2 ** attempt, 15)
+
+def harvest_get(path, api_token, account_id, params=None):
+    headers = harvest_headers(api_token, account_id)
+    limiter = rate_limiter(api_token, account_id)
+    cancel_event = _cancel_event.get()
+    with span(f"GET {path}"):
+        for attempt in range(MAX_RETRIES + 1):
+            if cancel_event is not None and cancel_event.is_set():
+                raise FetchCancelled(path)
+            with span("rate limit wait"):
+                limiter.acquire()
+            resp = session.get(f"{API_URL}{path}", headers=headers, params=params)
+            count(requests=1, bytes=len(resp.content))
+            if resp.status_code == 429 and attempt < MAX_RETRIES:
+                count(rate_limited=1)
+                limiter.pause(_retry_after(resp, attempt))
+                continue
+            resp.raise_for_status()
+            with span("decode JSON"):
+                return resp.json()
+
+# Fetch every page of a paginated endpoint. Each page's items under `key` are
+# passed through `project` as soon as they arrive; returns the projected pages.
+def fetch_pages(path, key, api_token, account_id, params, project=list):
+    params = dict(params, page=1)
+    first = harvest_get(path, api_token, account_id, params)
+    total_pages = first.get("total_pages") or 1
+    count(pages=total_pages)
+    pages = [project(first[key])]
+    del first
+    if total_pages == 1:
+        return pages
+
+    def fetch_page(page):
+        return project(harvest_get(path, api_token, account_id, dict(params, page=page))[key])
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, total_pages - 1)) as pool:
+        futures = [submit_in_context(pool, fetch_page, page) for page in range(2, total_pages + 1)]
+        pages.extend(future.result() for future in futures)
+    return pages
+
+def fetch_all_pages(path, key, api_token, account_id, params):
+    return [item for page in fetch_pages(path, key, api_token, account_id, params) for item in page]
+
+def fetch_user_id(api_token, account_id):
+    with span("fetch_user_id"):
+        return harvest_get("/users/me", api_token, account_id)["id"]
+
+def _entry_date(data):
+    if data["time_entries"]:
+        return datetime.datetime.strptime(data["time_entries"][0]["spent_date"], "%Y-%m-%d").date()
+    return None
+
+# Entries are returned newest first, so the earliest one is on the last one-row page
+def get_earliest_time_entry_date(user_id, api_token, account_id):
+    params = {"user_id": user_id, "per_page": 1, "page": 1}
+    with span("get_earliest_time_entry_date"):
+        data = harvest_get("/time_entries", api_token, account_id, params)
+        total_pages = data.get("total_pages", 1)
+        if total_pages > 1:
+            params["page"] = total_pages
+            data = harvest_get("/time_entries", api_token, account_id, params)
+        return _entry_date(data)
+
+def get_latest_time_entry_date(user_id, api_token, account_id):
+    params = {"user_id": user_id, "per_page": 1, "page": 1}
+    with span("get_latest_time_entry_date"):
+        return _entry_date(harvest_get("/time_entries", api_token, account_id, params))
+
+# Fetch time entries from Harvest (stateless) as TimeEntryColumns. Either bound
+# may be None, and updated_since limits the result to entries changed after
+# that UTC timestamp.
+def fetch_time_entries(start, end, user_id, api_token, account_id, updated_since=None):
+    params = {"user_id": user_id, "per_page": PER_PAGE}
+    if start is not None:
+        params["from"] = start.strftime("%Y-%m-%d")
+    if end is not None:
+        params["to"] = end.strftime("%Y-%m-%d")
+    if updated_since is not None:
+        params["updated_since"] = updated_since
+    with span("fetch_time_entries"):
+        pages = fetch_pages("/time_entries", "time_entries", api_token, account_id, params,
+                            project=TimeEntryColumns.from_entries)
+        return TimeEntryColumns.concat(pages)
+
+# Number of entries Harvest holds for the range, using a single one-row page
+def count_time_entries(start, end, user_id, api_token, account_id):
+    params = {
+        "user_id": user_id,
+        "from": start.strftime("%Y-%m-%d"),
+        "to": end.strftime("%Y-%m-%d"),
+        "per_page": 1,
+        "page": 1
+    }
+    return harvest_get("/time_entries", api_token, account_id, params).get("total_entries", 0)
+
+# Total hours the user logged between start and end, from the team time report
+# (one small request per year of range) instead of the individual entries.
+# Raises requests.HTTPError when the token may not read reports and
+# ReportUnavailable when a report has no row for the user.
+def fetch_reported_hours(start, end, user_id, api_token, account_id):
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(end, chunk_start + datetime.timedelta(days=REPORT_SPAN_DAYS - 1))
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + datetime.timedelta(days=1)
+
+    def chunk_hours(chunk):
+        params = {"from": chunk[0].strftime("%Y%m%d"), "to": chunk[1].strftime("%Y%m%d")}
+        results = fetch_all_pages("/reports/time/team", "results", api_token, account_id, params)
+        rows = [r for r in results if r["user_id"] == user_id]
+        if not rows:
+            raise ReportUnavailable(f"no report row for user {user_id}")
+        return sum(r["total_hours"] for r in rows)
+
+    with span("fetch_reported_hours"):
+        if len(chunks) == 1:
+            return chunk_hours(chunks[0])
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks))) as pool:
+            futures = [submit_in_context(pool, chunk_hours, chunk) for chunk in chunks]
+            return sum(future.result() for future in futures)
@@ -0,0 +1,104 @@
+# Leap Time Tracker - instrumentation.py (timing and request accounting)
+#
+# A Trace collects timed spans and counters (requests, bytes, pages, ...) for
+# one rerun. The active trace and the stack of open spans live in context
+# variables, so code that is not being traced pays almost nothing, and work
+# handed to a thread pool is attributed correctly when it is submitted through
+# submit_in_context. Counters are added to the trace total and to every span
+# that is open at the time, which gives per-stage figures.
+
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+_trace = contextvars.ContextVar("trace", default=None)
+_open_spans = contextvars.ContextVar("open_spans", default=())
+
+class Trace:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.totals = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def summary(self):
+        stages = {}
+        with self.lock:
+            for s in self.spans:
+                stage = stages.setdefault(s["name"], {"calls": 0, "seconds": 0.0, "counters": defaultdict(float)})
+                stage["calls"] += 1
+                stage["seconds"] += s["duration"]
+                for name, value in s["counters"].items():
+                    stage["counters"][name] += value
+        return stages
+
+    def to_json(self):
+        with self.lock:
+            return json.dumps({
+                "started_at": self.started_at,
+                "totals": dict(self.totals),
+                "spans": [dict(s, counters=dict(s["counters"])) for s in self.spans]
+            }, indent=2)
+
+    # Chrome trace event format, for chrome://tracing or Perfetto
+    def to_chrome_trace(self):
+        with self.lock:
+            events = [{
+                "name": s["name"],
+                "ph": "X",
+                "ts": round(s["start"] * 1e6),
+                "dur": round(s["duration"] * 1e6),
+                "pid": 1,
+                "tid": s["thread"],
+                "args": dict(s["counters"])
+            } for s in self.spans]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+def start_trace():
+    trace = Trace()
+    _trace.set(trace)
+    _open_spans.set(())
+    return trace
+
+# Make an existing trace the active one, e.g. at the start of a rerun
+def use_trace(trace):
+    _trace.set(trace)
+    _open_spans.set(())
+
+def current_trace():
+    return _trace.get()
+
+@contextmanager
+def span(name):
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    record = {"name": name, "start": time.perf_counter() - trace.origin, "duration": 0.0,
+              "thread": threading.get_ident(), "counters": defaultdict(float)}
+    token = _open_spans.set(_open_spans.get() + (record,))
+    try:
+        yield
+    finally:
+        _open_spans.reset(token)
+        record["duration"] = time.perf_counter() - trace.origin - record["start"]
+        with trace.lock:
+            trace.spans.append(record)
+
+def count(**amounts):
+    trace = _trace.get()
+    if trace is None:
+        return
+    with trace.lock:
+        for name, value in amounts.items():
+            trace.totals[name] += value
+            for record in _open_spans.get():
+                record["counters"][name] += value
+
+# executor.submit that carries the active trace and open spans into the worker
+def submit_in_context(executor, fn, *args):
+    return executor.submit(contextvars.copy_context().run, fn, *args)
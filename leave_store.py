@@ -0,0 +1,137 @@
+# Leap Time Tracker - leave_store.py (leave records)
+#
+# Leave is kept as merged, sorted date intervals per reason rather than one
+# record per day. Adding the same range twice is a no-op, removing a range
+# splits or trims the intervals it touches, and date membership is a binary
+# search over the union of all intervals.
+
+import datetime
+import re
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+NO_DESCRIPTION = "(No description)"
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+def _start(interval):
+    return interval[0]
+
+def _end(interval):
+    return interval[1]
+
+class LeaveStore:
+    def __init__(self):
+        self.intervals = {}     # reason -> sorted, disjoint [(start_ordinal, end_ordinal)]
+        self._union = None      # (starts, ends) arrays over all reasons, built on demand
+        self.version = 0        # bumped on every change, so views of the store can be reused
+
+    def __bool__(self):
+        return bool(self.intervals)
+
+    # Returns the number of days that were not already recorded for the reason
+    def add(self, start, end, reason):
+        if start > end:
+            return 0
+        reason = reason or NO_DESCRIPTION
+        s, e = start.toordinal(), end.toordinal()
+        ivs = self.intervals.setdefault(reason, [])
+        # Intervals that overlap or touch [s, e] are merged into it
+        lo = bisect_left(ivs, s - 1, key=_end)
+        hi = bisect_right(ivs, e + 1, key=_start)
+        covered = sum(max(0, min(e, ie) - max(s, is_) + 1) for is_, ie in ivs[lo:hi])
+        if lo < hi:
+            s = min(s, ivs[lo][0])
+            e = max(e, ivs[hi - 1][1])
+        ivs[lo:hi] = [(s, e)]
+        self._union = None
+        self.version += 1
+        return end.toordinal() - start.toordinal() + 1 - covered
+
+    def remove(self, start, end, reason):
+        if start > end:
+            return
+        reason = reason or NO_DESCRIPTION
+        ivs = self.intervals.get(reason)
+        if not ivs:
+            return
+        s, e = start.toordinal(), end.toordinal()
+        lo = bisect_left(ivs, s, key=_end)
+        hi = bisect_right(ivs, e, key=_start)
+        if lo >= hi:
+            return
+        pieces = []
+        if ivs[lo][0] < s:
+            pieces.append((ivs[lo][0], s - 1))
+        if ivs[hi - 1][1] > e:
+            pieces.append((e + 1, ivs[hi - 1][1]))
+        ivs[lo:hi] = pieces
+        if not ivs:
+            del self.intervals[reason]
+        self._union = None
+        self.version += 1
+
+    def _union_arrays(self):
+        if self._union is None:
+            merged = []
+            for s, e in sorted(iv for ivs in self.intervals.values() for iv in ivs):
+                if merged and s <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], e)
+                else:
+                    merged.append([s, e])
+            table = np.array(merged, dtype=np.int64).reshape(-1, 2)
+            self._union = (table[:, 0], table[:, 1])
+        return self._union
+
+    def __contains__(self, day):
+        starts, ends = self._union_arrays()
+        o = day.toordinal()
+        i = np.searchsorted(starts, o, side="right") - 1
+        return bool(i >= 0 and ends[i] >= o)
+
+    # Boolean mask for a datetime64[D] array
+    def mask(self, dates):
+        starts, ends = self._union_arrays()
+        if len(starts) == 0:
+            return np.zeros(len(dates), dtype=bool)
+        ords = dates.astype("int64") + EPOCH_ORDINAL
+        i = np.searchsorted(starts, ords, side="right") - 1
+        return (i >= 0) & (ends[np.maximum(i, 0)] >= ords)
+
+    # Every year from the first to the last day of leave, newest first
+    def years(self):
+        starts, ends = self._union_arrays()
+        if len(starts) == 0:
+            return []
+        first = datetime.date.fromordinal(int(starts[0])).year
+        last = datetime.date.fromordinal(int(ends[-1])).year
+        return list(range(last, first - 1, -1))
+
+    # (reason, start_date, end_date) sorted by reason then start
+    def ranges(self):
+        for reason in sorted(self.intervals):
+            for s, e in self.intervals[reason]:
+                yield reason, datetime.date.fromordinal(s), datetime.date.fromordinal(e)
+
+def parse_xero_holidays(text):
+    holidays = []
+    for line in text.strip().splitlines():
+        parts = line.split('\t')
+        if len(parts) < 3:
+            continue
+        desc = parts[1].strip() if parts[1].strip() else "Holiday"
+        date_range = parts[2].strip()
+        # Match date ranges like "05 Jan - 08 Jan 2026" or "25 Dec - 31 Dec 2025"
+        match = re.match(r"(\d{2} \w{3})\s*-\s*(\d{2} \w{3} \d{4})", date_range)
+        if match:
+            start_str, end_str = match.groups()
+            # If start_str doesn't have a year, take it from end_str
+            if len(start_str.split()) == 2:
+                start_str += " " + end_str.split()[-1]
+            try:
+                start_date = datetime.datetime.strptime(start_str, "%d %b %Y").date()
+                end_date = datetime.datetime.strptime(end_str, "%d %b %Y").date()
+                holidays.append((desc, start_date, end_date))
+            except Exception:
+                continue
+    return holidays
@@ -0,0 +1,122 @@
+# Leap Time Tracker - ledger.py (daily hours ledger)
+#
+# One row per calendar day in the selected range, built with NumPy in a single
+# pass from the weekday hours, the leave_store.LeaveStore mask and the logged
+# time entries. The balance and both graphs are derived from it. This module
+# does not import Streamlit so it can be tested and benchmarked on its own.
+
+import datetime
+
+import numpy as np
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+class Ledger:
+    def __init__(self, dates, standard, leave, actual):
+        self.dates = dates          # datetime64[D], one per calendar day
+        self.standard = standard    # contractual hours for the weekday
+        self.leave = leave          # contractual hours taken as leave
+        self.actual = actual        # hours logged in Harvest
+
+    @property
+    def expected(self):
+        return self.standard - self.leave
+
+    def __len__(self):
+        return len(self.dates)
+
+def default_daily_hours():
+    return {day: 7.5 for day in WEEKDAYS[:5]} | {"Saturday": 0.0, "Sunday": 0.0}
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+def weekday_hours(daily_hours):
+    return np.array([float(daily_hours.get(day, 0)) for day in WEEKDAYS])
+
+# Monday is 0, like datetime.date.weekday(); 1970-01-01 was a Thursday
+def weekdays(dates):
+    return (dates.astype("int64") + 3) % 7
+
+# time_entries is an entry_columns.TimeEntryColumns
+def actual_hours(dates, time_entries):
+    if len(dates) == 0 or len(time_entries) == 0:
+        return np.zeros(len(dates))
+    offsets = time_entries.days.astype("int64") - dates[0].astype("int64")
+    inside = (offsets >= 0) & (offsets < len(dates))
+    # Hours are stored as float32; Harvest records them to two decimals
+    logged = np.bincount(offsets[inside], weights=time_entries.hours[inside].astype(float), minlength=len(dates))
+    return np.round(logged, 2)
+
+def build_ledger(start, end, daily_hours, holidays, time_entries):
+    start = np.datetime64(_as_date(start), "D")
+    end = np.datetime64(_as_date(end), "D")
+    dates = np.arange(start, end + 1)
+    standard = weekday_hours(daily_hours)[weekdays(dates)]
+    leave = np.where(holidays.mask(dates), standard, 0.0)
+    return Ledger(dates, standard, leave, actual_hours(dates, time_entries))
+
+# Totals to two decimals, as Harvest shows them
+def _summary(logged_hours, expected_hours, reduced_hours):
+    return {
+        "logged": round(logged_hours, 2),
+        "expected": round(expected_hours, 2),
+        "reduced": round(reduced_hours, 2),
+        "balance": round(logged_hours - expected_hours + reduced_hours, 2)
+    }
+
+# logged_hours overrides the ledger's own total, e.g. when it came from a report
+def balance_summary(ledger, logged_hours=None):
+    logged_hours = float(ledger.actual.sum() if logged_hours is None else logged_hours)
+    return _summary(logged_hours, float(ledger.standard.sum()), float(ledger.leave.sum()))
+
+# Prefix sums over a user's whole history, so the balance of any sub-range is
+# a handful of array lookups. Expected and leave hours are kept as per-weekday
+# day counts, which means editing the standard hours needs no rebuild at all;
+# a leave change only patches the counts from the first changed day onwards.
+class LedgerIndex:
+    def __init__(self, start, end, holidays, time_entries):
+        self.start = _as_date(start)
+        self.end = _as_date(end)
+        self.dates = np.arange(np.datetime64(self.start, "D"), np.datetime64(self.end, "D") + 1)
+        self.weekday_onehot = weekdays(self.dates)[:, None] == np.arange(7)
+        self.weekday_counts = self._prefix(self.weekday_onehot)
+        self.leave_mask = holidays.mask(self.dates)
+        self.leave_counts = self._prefix(self.weekday_onehot & self.leave_mask[:, None])
+        self.actual = np.concatenate([[0.0], np.cumsum(actual_hours(self.dates, time_entries))])
+
+    @staticmethod
+    def _prefix(per_day):
+        counts = np.zeros((len(per_day) + 1, 7), dtype=np.int32)
+        np.cumsum(per_day, axis=0, out=counts[1:])
+        return counts
+
+    # Half-open row bounds for [start, end], clipped to the indexed history
+    def _bounds(self, start, end):
+        i = (_as_date(start) - self.start).days
+        j = (_as_date(end) - self.start).days + 1
+        i = min(max(i, 0), len(self.dates))
+        j = min(max(j, i), len(self.dates))
+        return i, j
+
+    def summary(self, start, end, daily_hours):
+        i, j = self._bounds(start, end)
+        hours = weekday_hours(daily_hours)
+        logged_hours = float(self.actual[j] - self.actual[i])
+        expected_hours = float(hours @ (self.weekday_counts[j] - self.weekday_counts[i]))
+        reduced_hours = float(hours @ (self.leave_counts[j] - self.leave_counts[i]))
+        return _summary(logged_hours, expected_hours, reduced_hours)
+
+    # Call after leave between start and end was added or removed
+    def update_leave(self, holidays, start, end):
+        i, j = self._bounds(start, end)
+        if i == j:
+            return
+        new_mask = holidays.mask(self.dates[i:j])
+        delta = new_mask.astype(np.int32) - self.leave_mask[i:j]
+        if not delta.any():
+            return
+        step = np.cumsum(self.weekday_onehot[i:j] * delta[:, None], axis=0, dtype=np.int32)
+        self.leave_counts[i + 1:j + 1] += step
+        self.leave_counts[j + 1:] += step[-1]
+        self.leave_mask[i:j] = new_mask
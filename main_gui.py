@@ -1,28 +1,27 @@
 # Leap Time Tracker - main_gui.py (Entry Point)
+#
+# Only Streamlit and the lightweight helper modules are imported up front;
+# pandas and Altair (via charts.py) load the first time a graph is drawn, so a
+# cold start reaches the credentials form without paying for them.
 
 import streamlit as st
-import requests
 import datetime
-import re
-import pandas as pd
-from itertools import groupby
-import altair as alt
+from bootstrap import cached_call, invalidate
+from datasource import SOURCES, balance_hours, balance_source
+from entry_columns import TimeEntryColumns
+from entry_cache import clear_time_entries
+from harvest import fetch_user_id, get_earliest_time_entry_date, get_latest_time_entry_date
+from instrumentation import current_trace, span, start_trace, use_trace
+from leave_store import LeaveStore, parse_xero_holidays
+from prefetch import Prefetcher
+from shared_cache import get_shared_time_entries, invalidate_time_entries, shared_entries
+from ledger import WEEKDAYS, LedgerIndex, balance_summary, build_ledger, default_daily_hours
 
 st.set_page_config(layout="wide")
 
-def get_working_days_in_range(start, end):
-    days = []
-    current = start
-    while current <= end:
-        days.append(current)
-        current += datetime.timedelta(days=1)
-    return days
-
-def calculate_expected_hours(working_days, standard_daily_hours):
-    total = 0
-    for day in working_days:
-        total += standard_daily_hours.get(day.strftime("%A"), 0)
-    return total
+# Timing and API call accounting for this rerun, shown under Performance Diagnostics
+st.session_state.trace = start_trace()
+st.session_state.trace_full_run = True
 
 left, main, right = st.columns([1, 4, 1])
 with main:
@@ -41,6 +40,7 @@ with main:
         - Go to **Settings > Developers > API V2 Tokens**.
         - Copy your **Personal Access Token** (API Token) and **Account ID**.
         - Enter these into the app's fields. The app will fetch your user info and available time entry dates.
+        - These are remembered for 15 minutes; click **Refresh from Harvest** to look them up again sooner.
 
         **3. Set Up Your Working Hours**
         - Enter your standard daily hours for each weekday (defaults to 7.5 for Mon–Fri).
@@ -49,6 +49,7 @@ with main:
         **4. Add Holidays**
         - To add a single holiday or a range, use the **Add Holiday** section.
         - To import multiple holidays from Xero, paste your Xero holiday export (e.g., `Holiday\tChristmas\t25 Dec - 31 Dec 2025\tApproved`) into the **Bulk Add Holidays from Xero** box and click the button.
+        - **Leave Records** lists your leave a page at a time. Filter by reason or year, tick **Delete** on any rows and click **Delete selected**, or remove everything matching the filter at once. With a year filter, ranges are cut to that year and only its days are removed.
 
         **5. Select Your Date Range**
         - The app will automatically set the start and end dates to match your earliest and latest Harvest time entries.
@@ -56,12 +57,15 @@ with main:
 
         **6. View Your Results**
         - Click **Calculate Balance** to see your hours owed or extra hours.
+        - **Data source** picks where logged hours come from. *Automatic* uses Harvest's time reports for the balance when that is cheaper and your Harvest role allows it; graphs always use individual time entries.
         - Use the **Show Hours Graph** button to compare contractual vs. worked hours over time.
         - Use the **Show Cumulative Balance Graph** to see how your hours owed/extra build up over time.
+        - Use **Explore Balance Over Time** to load your whole history once and then drag the range slider to see the balance for any period, or as of any day, instantly.
+        - For long date ranges the hours graph switches to weekly, monthly or yearly totals and the cumulative graph shows a thinned-out line with the same shape, so charts stay quick to draw.
 
         **7. Troubleshooting**
         - If you see authentication errors, double-check your API token and account ID.
-        - Your data is not saved between sessions for privacy.
+        - Your API token and settings are not saved between sessions for privacy. The dates and hours of your time entries are cached on the server so repeat queries are fast; use **Clear Cached Time Entries** to remove them.
         - If you have issues with date pickers, check your browser and system date settings.
         - For further help, contact your admin.
 
@@ -74,71 +78,39 @@ with main:
     api_token = st.text_input("Harvest API Token", type="password")
     account_id = st.text_input("Harvest Account ID")
 
-    # Fetch user ID on the fly
-    def fetch_user_id(api_token, account_id):
-        url = "https://api.harvestapp.com/api/v2/users/me"
-        headers = {
-            "Harvest-Account-ID": account_id,
-            "Authorization": f"Bearer {api_token}",
-            "User-Agent": "Harvest API Example"
-        }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()["id"]
-
     user_id = None
     if api_token and account_id:
         try:
-            user_id = fetch_user_id(api_token, account_id)
+            user_id = cached_call(api_token, account_id, "user_id", fetch_user_id, api_token, account_id)
             st.success(f"User ID fetched: {user_id}")
         except Exception as e:
             st.error(f"Failed to fetch user ID: {e}")
-
-    def get_earliest_time_entry_date(user_id, api_token, account_id):
-        url = "https://api.harvestapp.com/api/v2/time_entries"
-        headers = {
-            "Harvest-Account-ID": account_id,
-            "Authorization": f"Bearer {api_token}",
-            "User-Agent": "Harvest API Example"
-        }
-        params = {
-            "user_id": user_id,
-            "per_page": 1,
-            "page": 1
-        }
-        resp = requests.get(url, headers=headers, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        total_pages = data.get("total_pages", 1)
-        if total_pages > 1:
-            params["page"] = total_pages
-            resp = requests.get(url, headers=headers, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-        if data["time_entries"]:
-            return datetime.datetime.strptime(data["time_entries"][0]["spent_date"], "%Y-%m-%d").date()
-        else:
-            return def_start
-
-    def get_latest_time_entry_date(user_id, api_token, account_id):
-        url = "https://api.harvestapp.com/api/v2/time_entries"
-        headers = {
-            "Harvest-Account-ID": account_id,
-            "Authorization": f"Bearer {api_token}",
-            "User-Agent": "Harvest API Example"
-        }
-        params = {
-            "user_id": user_id,
-            "per_page": 1,
-            "page": 1
-        }
-        resp = requests.get(url, headers=headers, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        if data["time_entries"]:
-            return datetime.datetime.strptime(data["time_entries"][0]["spent_date"], "%Y-%m-%d").date()
-        else:
-            return def_end
+    if "prefetcher" not in st.session_state:
+        st.session_state.prefetcher = Prefetcher()
+
+    # Stops the prefetch (waiting for one that is mid-sync) and forgets the
+    # entries held for results, so the next result is loaded afresh
+    def drop_loaded_entries():
+        st.session_state.prefetcher.cancel(wait_for_running=True)
+        for name in ("time_entries", "reported_hours", "ledger_index"):
+            st.session_state.pop(name, None)
+
+    if user_id:
+        rcol1, rcol2 = st.columns(2)
+        if rcol1.button("Refresh from Harvest"):
+            drop_loaded_entries()
+            invalidate(api_token, account_id)
+            invalidate_time_entries(user_id, account_id)
+            st.rerun()
+        if rcol2.button("Clear Cached Time Entries"):
+            drop_loaded_entries()
+            clear_time_entries(user_id, account_id)
+            invalidate_time_entries(user_id, account_id)
+            invalidate(api_token, account_id)
+            # Do not fill the cache straight back up; the next result loads what it needs
+            st.session_state.entries_cleared = (account_id, user_id)
+            st.session_state.results_view = None
+            st.success("Cached time entries cleared.")
 
     # Date range selection
     st.subheader("Select Date Range")
@@ -156,14 +128,20 @@ with main:
     # Fetch and update earliest/latest entry dates BEFORE rendering widgets
     if user_id and api_token and account_id:
         try:
-            earliest = get_earliest_time_entry_date(user_id, api_token, account_id)
+            earliest = cached_call(
+                api_token, account_id, "earliest_entry_date",
+                get_earliest_time_entry_date, user_id, api_token, account_id
+            ) or def_start
             if earliest != st.session_state.earliest_entry_date:
                 st.session_state.earliest_entry_date = earliest
                 st.session_state.start_date = earliest
         except Exception as e:
             st.warning(f"Could not fetch earliest entry date: {e}")
         try:
-            latest = get_latest_time_entry_date(user_id, api_token, account_id)
+            latest = cached_call(
+                api_token, account_id, "latest_entry_date",
+                get_latest_time_entry_date, user_id, api_token, account_id
+            ) or def_end
             if latest != st.session_state.latest_entry_date:
                 st.session_state.latest_entry_date = latest
                 st.session_state.end_date = latest
@@ -182,260 +160,403 @@ with main:
     with col_end:
         end_date = st.date_input("End Date", key="end_date", format="DD/MM/YYYY")
 
+    def reports_allowed():
+        return st.session_state.get("reports_denied") != (account_id, user_id)
+
+    # Warm the time entries for this range while the user sets up hours and
+    # leave, unless the balance is going to come from the time reports
+    prefetch_key = (account_id, user_id, start_date, end_date)
+    if user_id and start_date <= end_date and st.session_state.get("entries_cleared") != (account_id, user_id) and (
+            st.session_state.prefetcher.key == prefetch_key or balance_source(
+                st.session_state.get("data_source", "auto"), start_date, end_date, user_id, account_id,
+                reports_allowed=reports_allowed()) == "entries"):
+        st.session_state.prefetcher.start(
+            prefetch_key, get_shared_time_entries, start_date, end_date, user_id, api_token, account_id
+        )
+    else:
+        st.session_state.prefetcher.cancel()
+
+    # Configuration and results are fragments: editing a widget inside one
+    # reruns only that section. Committed changes to hours or leave redraw the
+    # whole page when a result built from them is on screen.
+    def settings_changed(message=None):
+        if st.session_state.get("results_view"):
+            st.session_state.flash = message
+            st.rerun()
+        if message:
+            st.success(message)
+
     # Standard working hours (in-session only)
     st.subheader("Standard Working Hours")
-    def def_default_hours():
-        return {day: 7.5 for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]} | {"Saturday": 0.0, "Sunday": 0.0}
     if "standard_daily_hours" not in st.session_state:
-        st.session_state.standard_daily_hours = def_default_hours()
-    daily_hours = st.session_state.standard_daily_hours
-    col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
-    inputs = {}
-    for i, day in enumerate(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]):
-        with [col1, col2, col3, col4, col5, col6, col7][i]:
-            inputs[day] = st.number_input(day, min_value=0.0, max_value=24.0, value=float(daily_hours.get(day, 0)), step=0.25, key=f"hours_{day}")
-    if st.button("Save Standard Working Hours"):
-        for day in daily_hours:
-            daily_hours[day] = float(inputs[day])
-        st.session_state.standard_daily_hours = daily_hours
-        st.success("Standard working hours saved (session only).")
+        st.session_state.standard_daily_hours = default_daily_hours()
+
+    @st.fragment
+    def standard_hours_section():
+        daily_hours = st.session_state.standard_daily_hours
+        col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
+        inputs = {}
+        for i, day in enumerate(WEEKDAYS):
+            with [col1, col2, col3, col4, col5, col6, col7][i]:
+                inputs[day] = st.number_input(day, min_value=0.0, max_value=24.0, value=float(daily_hours.get(day, 0)), step=0.25, key=f"hours_{day}")
+        if st.button("Save Standard Working Hours"):
+            for day in daily_hours:
+                daily_hours[day] = float(inputs[day])
+            st.session_state.standard_daily_hours = daily_hours
+            settings_changed("Standard working hours saved (session only).")
+
+    standard_hours_section()
 
     # Leave management (in-session only)
     st.subheader("Leave Management")
     if "holidays" not in st.session_state:
-        st.session_state.holidays = []
-
-    # Bulk Add Holidays from Xero
-    st.markdown("**Bulk Add Holidays from Xero:**")
-    xero_bulk = st.text_area("Paste Xero leave requests here", height=120, key="xero_bulk")
-
-    def parse_xero_holidays(text):
-        holidays = []
-        for line in text.strip().splitlines():
-            parts = line.split('\t')
-            if len(parts) < 3:
-                continue
-            desc = parts[1].strip() if parts[1].strip() else "Holiday"
-            date_range = parts[2].strip()
-            # Match date ranges like "05 Jan - 08 Jan 2026" or "25 Dec - 31 Dec 2025"
-            match = re.match(r"(\d{2} \w{3})\s*-\s*(\d{2} \w{3} \d{4})", date_range)
-            if match:
-                start_str, end_str = match.groups()
-                # If start_str doesn't have a year, take it from end_str
-                if len(start_str.split()) == 2:
-                    start_str += " " + end_str.split()[-1]
-                try:
-                    start_date = datetime.datetime.strptime(start_str, "%d %b %Y").date()
-                    end_date = datetime.datetime.strptime(end_str, "%d %b %Y").date()
-                    holidays.append((desc, start_date, end_date))
-                except Exception:
+        st.session_state.holidays = LeaveStore()
+
+    # Keep the balance explorer's index in step with the leave store
+    def leave_changed(start, end):
+        held = st.session_state.get("ledger_index")
+        if held is not None:
+            held[1].update_leave(st.session_state.holidays, start, end)
+
+    LEAVE_PAGE_SIZE = 25
+
+    # Filtered (reason, start, end) ranges, rebuilt only when the store or the
+    # filter changes, so paging and ticking rows does not rescan the history.
+    # With a year filter, ranges are clipped to that year, so deleting a
+    # December-January range from one year leaves the other year's days alone.
+    def leave_rows(leave_store, key_prefix, reasons, year):
+        key = (id(leave_store), leave_store.version, tuple(reasons), year)
+        held = st.session_state.get(f"{key_prefix}_rows")
+        if held is None or held[0] != key:
+            rows = []
+            for desc, start, end in leave_store.ranges():
+                if reasons and desc not in reasons:
                     continue
-        return holidays
-
-    if st.button("Bulk Add Holidays from Xero"):
-        holidays = parse_xero_holidays(xero_bulk)
-        count = 0
-        for desc, start_date, end_date in holidays:
-            current = start_date
-            while current <= end_date:
-                st.session_state.holidays.append({"date": current.isoformat(), "reason": desc})
-                current += datetime.timedelta(days=1)
-                count += 1
-        st.success(f"Added {count} holiday days from Xero.")
-
-    # Add Holiday
-    st.markdown("**Add Holiday (range):**")
-    hcol1, hcol2 = st.columns(2)
-    holiday_start = hcol1.date_input("Holiday Start", key="holiday_start", format="DD/MM/YYYY")
-    holiday_end = hcol2.date_input("Holiday End", key="holiday_end", format="DD/MM/YYYY")
-    holiday_reason = st.text_input("Holiday Description", value="Approved Holiday", key="holiday_reason")
-    if st.button("Add Holiday"):
-        if holiday_start > holiday_end:
-            st.error("Holiday start date must be before end date.")
-        else:
-            current = holiday_start
-            while current <= holiday_end:
-                iso_date = current.isoformat()
-                st.session_state.holidays.append({"date": iso_date, "reason": holiday_reason})
-                current += datetime.timedelta(days=1)
-            st.success("Holiday(s) added (session only).")
-
-    def display_leave_records(leave_list, leave_type, key_prefix):
-        if not leave_list:
+                if year is not None:
+                    if not start.year <= year <= end.year:
+                        continue
+                    start = max(start, datetime.date(year, 1, 1))
+                    end = min(end, datetime.date(year, 12, 31))
+                rows.append((desc, start, end))
+            held = st.session_state[f"{key_prefix}_rows"] = (key, rows)
+        return held[1]
+
+    # Button callback: runs before the fragment, which then draws the new table
+    def remove_leave(leave_store, key_prefix, rows):
+        for desc, start, end in rows:
+            leave_store.remove(start, end, desc)
+        leave_changed(min(start for _, start, _ in rows), max(end for _, _, end in rows))
+        st.session_state[f"{key_prefix}_removed"] = True
+
+    # One paginated table of leave ranges with a Delete column, instead of a
+    # row of widgets per range; only the current page is sent to the browser
+    def display_leave_records(leave_store, leave_type, key_prefix):
+        if st.session_state.pop(f"{key_prefix}_removed", False):
+            settings_changed()
+        if not leave_store:
             st.write(f"No {leave_type.lower()}s recorded.")
             return
-        if leave_type == "Holiday":
-            # Sort by description then date
-            sorted_list = sorted(leave_list, key=lambda x: (x.get("reason") or "(No description)", x["date"]))
-            for i, (desc, group) in enumerate(groupby(sorted_list, key=lambda x: x.get("reason") or "(No description)")):
-                dates = [datetime.datetime.strptime(item["date"], "%Y-%m-%d") for item in group]
-                dates.sort()
-                # Group consecutive dates
-                ranges = []
-                for date in dates:
-                    if not ranges or (date - ranges[-1][-1]).days > 1:
-                        ranges.append([date, date])
-                    else:
-                        ranges[-1][-1] = date
-                for j, (start, end) in enumerate(ranges):
-                    start_str = start.strftime("%d/%m/%Y")
-                    end_str = end.strftime("%d/%m/%Y")
-                    period = f"{start_str} - {end_str}" if start != end else start_str
-                    col1, col2 = st.columns([4, 1])
-                    with col1:
-                        st.write(f"**{leave_type}:** {desc} | {period}")
-                    with col2:
-                        if st.button("Remove", key=f"{key_prefix}_{i}_{j}"):
-                            to_remove = set((start + datetime.timedelta(days=k)).strftime("%Y-%m-%d")
-                                            for k in range((end - start).days + 1))
-                            leave_list[:] = [item for item in leave_list if not (
-                                (item.get('reason') or "(No description)") == desc and item["date"] in to_remove
-                            )]
-                            st.rerun()
-
-    st.markdown("---")
-    st.markdown("### Leave Records")
-    display_leave_records(st.session_state.holidays, "Holiday", "holiday")
-
-    # Fetch time entries from Harvest (stateless)
-    def fetch_time_entries(start, end, user_id, api_token, account_id):
-        url = "https://api.harvestapp.com/api/v2/time_entries"
-        headers = {
-            "Harvest-Account-ID": account_id,
-            "Authorization": f"Bearer {api_token}",
-            "User-Agent": "Harvest API Example"
-        }
-        params = {
-            "user_id": user_id,
-            "from": start.strftime("%Y-%m-%d"),
-            "to": end.strftime("%Y-%m-%d")
-        }
-        entries = []
-        page = 1
-        while True:
-            params["page"] = page
-            resp = requests.get(url, headers=headers, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            entries.extend(data["time_entries"])
-            if not data.get("next_page"):
-                break
-            page += 1
-        return entries
-
-    def calculate_balance(start, end, user_id, api_token, account_id, daily_hours, holidays):
-        time_entries = fetch_time_entries(start, end, user_id, api_token, account_id)
-        logged_hours = sum(e["hours"] for e in time_entries)
-        working_days = get_working_days_in_range(start, end)
-        expected_hours = calculate_expected_hours(working_days, daily_hours)
-        holiday_days = [datetime.datetime.strptime(h["date"], "%Y-%m-%d") for h in holidays if start <= datetime.datetime.strptime(h["date"], "%Y-%m-%d") <= end]
-        reduced_hours = sum(daily_hours.get(day.strftime("%A"), 0) for day in holiday_days)
-        balance = round(logged_hours - expected_hours + reduced_hours, 2)
+        reason_options = sorted(leave_store.intervals)
+        year_options = [None] + leave_store.years()
+        # Drop filter values that no longer exist before the widgets are built
+        chosen = st.session_state.get(f"{key_prefix}_reasons", [])
+        st.session_state[f"{key_prefix}_reasons"] = [r for r in chosen if r in reason_options]
+        if st.session_state.get(f"{key_prefix}_year") not in year_options:
+            st.session_state[f"{key_prefix}_year"] = None
+        fcol1, fcol2 = st.columns([3, 1])
+        reasons = fcol1.multiselect("Filter by reason", reason_options, key=f"{key_prefix}_reasons")
+        year = fcol2.selectbox("Year", year_options, key=f"{key_prefix}_year",
+                               format_func=lambda y: "All years" if y is None else str(y))
+        rows = leave_rows(leave_store, key_prefix, reasons, year)
+        if not rows:
+            st.write(f"No {leave_type.lower()}s match the filter.")
+            return
+
+        # Widget keys carry the filter, so a new filter starts on page one
+        view = f"{key_prefix}_{hash((tuple(reasons), year))}"
+        pages = -(-len(rows) // LEAVE_PAGE_SIZE)
+        page = min(st.session_state.get(f"{view}_page", 1), pages)
+        if pages > 1:
+            st.session_state[f"{view}_page"] = page
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=f"{view}_page")
+        first = (page - 1) * LEAVE_PAGE_SIZE
+        shown = rows[first:first + LEAVE_PAGE_SIZE]
+        # A new key per page and store version starts with no rows ticked
+        editor_key = f"{view}_table_{leave_store.version}_{page}"
+        st.data_editor(
+            {
+                "Delete": [False] * len(shown),
+                leave_type: [desc for desc, _, _ in shown],
+                "From": [start for _, start, _ in shown],
+                "To": [end for _, _, end in shown],
+                "Days": [(end - start).days + 1 for _, start, end in shown],
+            },
+            key=editor_key, hide_index=True, width="stretch",
+            disabled=[leave_type, "From", "To", "Days"],
+            column_config={
+                "Delete": st.column_config.CheckboxColumn("Delete", width="small"),
+                "From": st.column_config.DateColumn("From", format="DD/MM/YYYY"),
+                "To": st.column_config.DateColumn("To", format="DD/MM/YYYY"),
+            }
+        )
+        st.caption(f"Showing {first + 1}–{first + len(shown)} of {len(rows)} ranges")
+        edits = st.session_state[editor_key]["edited_rows"]
+        selected = [shown[i] for i, change in edits.items() if change.get("Delete")]
+        dcol1, dcol2 = st.columns(2)
+        dcol1.button(f"Delete selected ({len(selected)})", key=f"{key_prefix}_delete_selected", disabled=not selected,
+                     on_click=remove_leave, args=(leave_store, key_prefix, selected))
+        if reasons or year is not None:
+            dcol2.button(f"Delete all {len(rows)} matching the filter", key=f"{key_prefix}_delete_matching",
+                         on_click=remove_leave, args=(leave_store, key_prefix, rows))
+
+    @st.fragment
+    def leave_section():
+        # Bulk Add Holidays from Xero
+        st.markdown("**Bulk Add Holidays from Xero:**")
+        xero_bulk = st.text_area("Paste Xero leave requests here", height=120, key="xero_bulk")
+
+        if st.button("Bulk Add Holidays from Xero"):
+            count = 0
+            for desc, start, end in parse_xero_holidays(xero_bulk):
+                count += st.session_state.holidays.add(start, end, desc)
+                leave_changed(start, end)
+            settings_changed(f"Added {count} holiday days from Xero.")
+
+        # Add Holiday
+        st.markdown("**Add Holiday (range):**")
+        hcol1, hcol2 = st.columns(2)
+        holiday_start = hcol1.date_input("Holiday Start", key="holiday_start", format="DD/MM/YYYY")
+        holiday_end = hcol2.date_input("Holiday End", key="holiday_end", format="DD/MM/YYYY")
+        holiday_reason = st.text_input("Holiday Description", value="Approved Holiday", key="holiday_reason")
+        if st.button("Add Holiday"):
+            if holiday_start > holiday_end:
+                st.error("Holiday start date must be before end date.")
+            else:
+                st.session_state.holidays.add(holiday_start, holiday_end, holiday_reason)
+                leave_changed(holiday_start, holiday_end)
+                settings_changed("Holiday(s) added (session only).")
+
+        st.markdown("---")
+        st.markdown("### Leave Records")
+        display_leave_records(st.session_state.holidays, "Holiday", "holiday")
+
+    leave_section()
+
+    # Entries for the range on screen are kept in the session so results can be
+    # redrawn after a settings change without going back to Harvest.
+    def load_time_entries(start, end, user_id, api_token, account_id, refresh):
+        key = (account_id, user_id, start, end)
+        held = st.session_state.get("time_entries")
+        if refresh or held is None or held[0] != key:
+            with span("prefetched entries"):
+                time_entries = st.session_state.prefetcher.take(key)
+            if time_entries is None:
+                time_entries = get_shared_time_entries(start, end, user_id, api_token, account_id)
+            st.session_state.time_entries = (key, time_entries)
+        return st.session_state.time_entries[1]
+
+    def load_ledger(start, end, user_id, api_token, account_id, daily_hours, holidays, refresh=True):
+        time_entries = load_time_entries(start, end, user_id, api_token, account_id, refresh)
+        with span("build ledger"):
+            return build_ledger(start, end, daily_hours, holidays, time_entries)
+
+    # The balance only needs total hours, so it may come from the time reports
+    # (see datasource.py); the reported total is kept like the entries are.
+    def load_balance_summary(start, end, user_id, api_token, account_id, daily_hours, holidays, refresh):
+        key = (account_id, user_id, start, end)
+        if refresh:
+            st.session_state.reported_hours = None
+            held_entries = st.session_state.get("time_entries")
+            loaded = st.session_state.prefetcher.has(key) or (held_entries is not None and held_entries[0] == key)
+            hours, denied = balance_hours(
+                st.session_state.get("data_source", "auto"), start, end, user_id, api_token, account_id,
+                loaded, reports_allowed()
+            )
+            if denied:
+                # Use the entries from now on
+                st.session_state.reports_denied = (account_id, user_id)
+            if hours is not None:
+                st.session_state.reported_hours = (key, hours)
+        held = st.session_state.get("reported_hours")
+        if held is not None and held[0] == key:
+            ledger = build_ledger(start, end, daily_hours, holidays, TimeEntryColumns.empty())
+            return balance_summary(ledger, logged_hours=held[1]), "Harvest time reports"
+        ledger = load_ledger(start, end, user_id, api_token, account_id, daily_hours, holidays, refresh)
+        return balance_summary(ledger), "Time entries"
+
+    def calculate_balance(start, end, user_id, api_token, account_id, daily_hours, holidays, refresh=True):
+        with span("calculate_balance"):
+            summary, source = load_balance_summary(start, end, user_id, api_token, account_id, daily_hours, holidays, refresh)
         with st.expander("Calculation Details"):
-            st.write(f"**Logged hours:** {logged_hours}")
-            st.write(f"**Expected hours:** {expected_hours}")
-            st.write(f"**Reduced hours (holidays):** {reduced_hours}")
-            st.write(f"**Balance:** {balance}")
-        return balance
-
-    if st.button("Calculate Balance", type="primary"):
-        if not (api_token and account_id and user_id):
-            st.error("Please enter valid API credentials.")
+            st.write(f"**Data source:** {source}")
+            st.write(f"**Logged hours:** {summary['logged']}")
+            st.write(f"**Expected hours:** {summary['expected']}")
+            st.write(f"**Reduced hours (holidays):** {summary['reduced']}")
+            st.write(f"**Balance:** {summary['balance']}")
+        return summary["balance"]
+
+    # Prefix-sum index over the user's whole history for the balance explorer
+    def load_ledger_index(user_id, api_token, account_id, refresh):
+        start = st.session_state.earliest_entry_date
+        end = max(st.session_state.latest_entry_date, datetime.date.today())
+        key = (account_id, user_id, start, end)
+        held = st.session_state.get("ledger_index")
+        if refresh or held is None or held[0] != key:
+            time_entries = get_shared_time_entries(start, end, user_id, api_token, account_id)
+            with span("build ledger index"):
+                st.session_state.ledger_index = (key, LedgerIndex(start, end, st.session_state.holidays, time_entries))
+        return st.session_state.ledger_index[1]
+
+    def balance_explorer(start_date, end_date, user_id, api_token, account_id, refresh):
+        index = load_ledger_index(user_id, api_token, account_id, refresh)
+        if index.start == index.end:
+            # A slider needs two distinct ends, so a one-day history is shown as is
+            st.write(f"The history covers a single day, {index.start.strftime('%d/%m/%Y')}.")
+            explore_start = explore_end = index.start
+        else:
+            default = (min(max(start_date, index.start), index.end), max(min(end_date, index.end), index.start))
+            explore_start, explore_end = st.slider(
+                "Range", min_value=index.start, max_value=index.end, value=default,
+                format="DD/MM/YYYY", key="explorer_range"
+            )
+        with span("balance explorer"):
+            summary = index.summary(explore_start, explore_end, st.session_state.standard_daily_hours)
+        mcol1, mcol2, mcol3 = st.columns(3)
+        mcol1.metric("Logged hours", round(summary["logged"], 2))
+        mcol2.metric("Expected hours", round(summary["expected"] - summary["reduced"], 2))
+        mcol3.metric(f"Balance as of {explore_end.strftime('%d/%m/%Y')}", summary["balance"])
+
+    # Button callbacks run before the fragment, so only the chosen result is drawn
+    def request_result(view):
+        st.session_state.results_view = view
+        st.session_state.results_refresh = True
+        st.session_state.pop("entries_cleared", None)
+
+    def diagnostics_panel():
+        trace = current_trace()
+        with st.expander("Performance Diagnostics"):
+            stages = trace.summary()
+            if not stages:
+                st.write("Nothing was timed in this rerun.")
+                return
+            # A markdown table keeps pandas out of the first render
+            lines = ["| Stage | Calls | Seconds | Requests | Bytes | Pages | Rate limited |",
+                     "|---|---:|---:|---:|---:|---:|---:|"]
+            for name, stage in stages.items():
+                counters = stage["counters"]
+                lines.append(f"| {name} | {stage['calls']} | {stage['seconds']:.4f} | {int(counters.get('requests', 0))} | "
+                             f"{int(counters.get('bytes', 0)):,} | {int(counters.get('pages', 0))} | "
+                             f"{int(counters.get('rate_limited', 0))} |")
+            st.markdown("\n".join(lines))
+            totals = trace.totals
+            st.write(f"**This rerun:** {int(totals.get('requests', 0))} Harvest requests, "
+                     f"{int(totals.get('bytes', 0)):,} bytes, {int(totals.get('pages', 0))} pages, "
+                     f"{int(totals.get('shared_cache_hits', 0))} shared cache hits, "
+                     f"{int(totals.get('shared_cache_waits', 0))} waits on another session's load")
+            shared = shared_entries.stats()
+            st.write(f"**Shared entry cache:** {shared['entries']} ranges, {shared['bytes']:,} bytes, "
+                     f"{shared['loading']} loading")
+            dcol1, dcol2 = st.columns(2)
+            dcol1.download_button("Download JSON", trace.to_json(), file_name="timetracker-trace.json",
+                                  mime="application/json", on_click="ignore")
+            dcol2.download_button("Download Chrome Trace", trace.to_chrome_trace(), file_name="timetracker-chrome-trace.json",
+                                  mime="application/json", on_click="ignore")
+
+    @st.fragment
+    def results_section(start_date, end_date, user_id, api_token, account_id):
+        # A rerun of just this fragment gets a trace of its own
+        if st.session_state.get("trace_full_run"):
+            use_trace(st.session_state.trace)
         else:
-            try:
-                start = datetime.datetime.combine(start_date, datetime.time.min)
-                end = datetime.datetime.combine(end_date, datetime.time.max)
-                if start > end:
-                    st.error("Start date must be before end date.")
-                else:
-                    balance = calculate_balance(
-                        start, end, user_id, api_token, account_id,
+            st.session_state.trace = start_trace()
+        if st.session_state.get("flash"):
+            st.success(st.session_state.pop("flash"))
+        view = st.session_state.get("results_view")
+        refresh = st.session_state.pop("results_refresh", False)
+        current = (account_id, user_id, start_date, end_date)
+        if view in ("balance", "hours", "cumulative") and not refresh and st.session_state.get("results_key") != current:
+            # Credentials or range changed since the result was drawn
+            view = st.session_state.results_view = None
+        st.session_state.results_key = current
+        held_index = st.session_state.get("ledger_index")
+        if view == "explorer" and not refresh and (held_index is None or held_index[0][:2] != (account_id, user_id)):
+            view = st.session_state.results_view = None
+
+        st.selectbox("Data source", options=list(SOURCES), format_func=SOURCES.get, key="data_source",
+                     help="Automatic uses Harvest's time reports for the balance when that takes fewer requests.")
+        st.button("Calculate Balance", type="primary", on_click=request_result, args=("balance",))
+        if view == "balance":
+            if not (api_token and account_id and user_id):
+                st.error("Please enter valid API credentials.")
+            else:
+                try:
+                    start = datetime.datetime.combine(start_date, datetime.time.min)
+                    end = datetime.datetime.combine(end_date, datetime.time.max)
+                    if start > end:
+                        st.error("Start date must be before end date.")
+                    else:
+                        balance = calculate_balance(
+                            start_date, end_date, user_id, api_token, account_id,
+                            st.session_state.standard_daily_hours,
+                            st.session_state.holidays,
+                            refresh
+                        )
+                        if balance > 0:
+                            st.success(f"You are owed {balance} hours.")
+                        elif balance < 0:
+                            st.warning(f"You owe {abs(balance)} hours.")
+                        else:
+                            st.info("You are exactly on track. No hours owed or owing.")
+                except Exception as e:
+                    st.error(f"Failed to calculate balance: {e}")
+
+        st.button("Show Hours Graph", on_click=request_result, args=("hours",))
+        if view == "hours":
+            if not (api_token and account_id and user_id):
+                st.error("Please enter valid API credentials.")
+            else:
+                try:
+                    ledger = load_ledger(
+                        start_date, end_date, user_id, api_token, account_id,
                         st.session_state.standard_daily_hours,
-                        st.session_state.holidays
+                        st.session_state.holidays,
+                        refresh
                     )
-                    if balance > 0:
-                        st.success(f"You are owed {balance} hours.")
-                    elif balance < 0:
-                        st.warning(f"You owe {abs(balance)} hours.")
-                    else:
-                        st.info("You are exactly on track. No hours owed or owing.")
-            except Exception as e:
-                st.error(f"Failed to calculate balance: {e}")
-
-    if st.button("Show Hours Graph"):
-        all_dates = pd.date_range(start=start_date, end=end_date)
-        weekday_hours = st.session_state.standard_daily_hours
-        expected = []
-        for d in all_dates:
-            if any(h["date"] == d.date().isoformat() for h in st.session_state.holidays):
-                expected.append(0)
+                    with span("hours chart"):
+                        from charts import hours_chart, hours_chart_data
+                        st.altair_chart(hours_chart(*hours_chart_data(ledger)), use_container_width=True)
+                except Exception as e:
+                    st.error(f"Failed to draw the hours graph: {e}")
+
+        st.button("Show Cumulative Balance Graph", on_click=request_result, args=("cumulative",))
+        if view == "cumulative":
+            if not (api_token and account_id and user_id):
+                st.error("Please enter valid API credentials.")
             else:
-                expected.append(weekday_hours.get(d.strftime("%A"), 0))
-        time_entries = fetch_time_entries(
-            datetime.datetime.combine(start_date, datetime.time.min),
-            datetime.datetime.combine(end_date, datetime.time.max),
-            user_id, api_token, account_id
-        )
-        actual_dict = {}
-        for entry in time_entries:
-            actual_dict.setdefault(entry["spent_date"], 0)
-            actual_dict[entry["spent_date"]] += entry["hours"]
-        actual = [actual_dict.get(d.date().isoformat(), 0) for d in all_dates]
-        # Build DataFrame for legend-enabled overlayed bar chart
-        data = []
-        for date, exp, act in zip(all_dates, expected, actual):
-            if exp == 0:
-                continue
-            # Contractual bar (always from 0 to exp)
-            data.append({"Date": date, "Type": "Contractual Hours", "y0": 0, "y1": exp, "Value": exp})
-            # Overtime bar (from exp to act, if act > exp)
-            if act > exp:
-                data.append({"Date": date, "Type": "Overtime", "y0": exp, "y1": act, "Value": act - exp})
-            # Shortfall bar (from act to exp, if act < exp)
-            if act < exp:
-                data.append({"Date": date, "Type": "Shortfall", "y0": act, "y1": exp, "Value": exp - act})
-        df = pd.DataFrame(data)
-        color_scale = alt.Scale(domain=["Contractual Hours", "Overtime", "Shortfall"], range=["#2471A3", "#D7263D", "#21A179"])
-        chart = alt.Chart(df).mark_bar().encode(
-            x=alt.X("Date:T", title="Date", axis=alt.Axis(labelAngle=-45)),
-            y=alt.Y("y0:Q", title="Hours"),
-            y2=alt.Y2("y1:Q"),
-            color=alt.Color("Type:N", scale=color_scale, legend=alt.Legend(title="Type")),
-            tooltip=["Date:T", "Type:N", alt.Tooltip("Value:Q", title="Hours")]
-        ).properties(title="Contractual, Overtime, and Shortfall Hours").configure_axis(labelFontSize=11)
-        st.altair_chart(chart, use_container_width=True)
-
-    if st.button("Show Cumulative Balance Graph"):
-        all_dates = pd.date_range(start=start_date, end=end_date)
-        weekday_hours = st.session_state.standard_daily_hours
-        expected = []
-        for d in all_dates:
-            if any(h["date"] == d.date().isoformat() for h in st.session_state.holidays):
-                expected.append(0)
+                try:
+                    ledger = load_ledger(
+                        start_date, end_date, user_id, api_token, account_id,
+                        st.session_state.standard_daily_hours,
+                        st.session_state.holidays,
+                        refresh
+                    )
+                    with span("cumulative chart"):
+                        from charts import cumulative_chart, cumulative_chart_data
+                        st.altair_chart(cumulative_chart(cumulative_chart_data(ledger)), use_container_width=True)
+                except Exception as e:
+                    st.error(f"Failed to draw the cumulative graph: {e}")
+
+        st.button("Explore Balance Over Time", on_click=request_result, args=("explorer",))
+        if view == "explorer":
+            if not (api_token and account_id and user_id):
+                st.error("Please enter valid API credentials.")
             else:
-                expected.append(weekday_hours.get(d.strftime("%A"), 0))
-        time_entries = fetch_time_entries(
-            datetime.datetime.combine(start_date, datetime.time.min),
-            datetime.datetime.combine(end_date, datetime.time.max),
-            user_id, api_token, account_id
-        )
-        actual_dict = {}
-        for entry in time_entries:
-            actual_dict.setdefault(entry["spent_date"], 0)
-            actual_dict[entry["spent_date"]] += entry["hours"]
-        actual = [actual_dict.get(d.date().isoformat(), 0) for d in all_dates]
-        # Calculate cumulative sums
-        df_cum = pd.DataFrame({
-            "Date": all_dates,
-            "Contractual Hours": pd.Series(expected).cumsum(),
-            "Hours Worked": pd.Series(actual).cumsum()
-        })
-        df_cum_melt = df_cum.melt("Date", var_name="Type", value_name="Cumulative Hours")
-        color_scale = alt.Scale(domain=["Hours Worked", "Contractual Hours"], range=["#29335C", "#E4572E"])
-        chart_cum = alt.Chart(df_cum_melt).mark_line(point=True).encode(
-            x=alt.X("Date:T", title="Date"),
-            y=alt.Y("Cumulative Hours:Q", title="Cumulative Hours"),
-            color=alt.Color("Type:N", scale=color_scale, legend=alt.Legend(title="")),
-            tooltip=["Date:T", "Type:N", "Cumulative Hours:Q"]
-        ).properties(title="Cumulative Contractual vs Hours Worked")
-        st.altair_chart(chart_cum, use_container_width=True)
+                try:
+                    balance_explorer(start_date, end_date, user_id, api_token, account_id, refresh)
+                except Exception as e:
+                    st.error(f"Failed to explore the balance: {e}")
+
+        diagnostics_panel()
+
+    results_section(start_date, end_date, user_id, api_token, account_id)
+    st.session_state.trace_full_run = False
@@ -0,0 +1,62 @@
+# Leap Time Tracker - prefetch.py (background time entry prefetch)
+#
+# Once the user and date range are known the app starts loading the time
+# entries in the background, while the user is still editing hours and leave.
+# Each session owns a Prefetcher holding at most one fetch, keyed by
+# (account, user, start, end); a new key cancels the old fetch before its next
+# Harvest request. The action buttons take the finished or running result
+# instead of starting a cold fetch.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from harvest import cancellable
+
+MAX_PREFETCHES = 4
+
+_executor = ThreadPoolExecutor(max_workers=MAX_PREFETCHES, thread_name_prefix="prefetch")
+
+def _run(event, fn, args):
+    with cancellable(event):
+        return fn(*args)
+
+class Prefetcher:
+    def __init__(self):
+        self.key = None
+        self.future = None
+        self.event = None
+
+    # Starting the same key again is a no-op, even after its result was taken
+    def start(self, key, fn, *args):
+        if key == self.key:
+            return
+        self.cancel()
+        self.key = key
+        self.event = threading.Event()
+        self.future = _executor.submit(_run, self.event, fn, args)
+
+    # With wait_for_running, returns only once a fetch already running has stopped
+    def cancel(self, wait_for_running=False):
+        if self.event is not None:
+            self.event.set()
+        if self.future is not None and not self.future.cancel() and wait_for_running:
+            wait([self.future])
+        self.key = self.future = self.event = None
+
+    def has(self, key):
+        return key == self.key and self.future is not None
+
+    # Waits for a fetch that is already running; None if there is nothing
+    # usable for `key`. The pool is shared by every session, so a fetch still
+    # queued behind other users' prefetches is dropped and the caller loads
+    # directly instead of waiting its turn.
+    def take(self, key):
+        if key != self.key or self.future is None:
+            return None
+        future, self.future = self.future, None
+        if future.cancel():
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
@@ -0,0 +1,129 @@
+# Leap Time Tracker - shared_cache.py (process-wide time entry cache)
+#
+# One Streamlit server hosts every session, and sessions for the same user
+# (two tabs, a double click, a prefetch racing a button) would otherwise each
+# fetch the same entries. Loaded TimeEntryColumns are kept here for all
+# sessions, keyed by a hash of (account, user, start, end), and evicted least
+# recently used first once SHARED_CACHE_BYTES is exceeded or after
+# SHARED_CACHE_TTL seconds. Identical loads already in flight are coalesced:
+# later callers wait for the first one instead of fetching again. Invalidating
+# an owner bumps its generation, so loads started before that are handed to
+# their callers but never stored or shared with later ones. The user id
+# always comes from the session's own token (/users/me), so a session only
+# reaches entries its token resolved to. Cached arrays are read-only.
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from entry_cache import get_time_entries
+from harvest import FetchCancelled
+from instrumentation import count, span
+
+SHARED_CACHE_BYTES = int(os.environ.get("TIMETRACKER_SHARED_CACHE_MB", 256)) * 1024 * 1024
+SHARED_CACHE_TTL = float(os.environ.get("TIMETRACKER_SHARED_CACHE_TTL", 120))
+
+def _digest(*parts):
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode()).hexdigest()
+
+class SharedCache:
+    def __init__(self, max_bytes=SHARED_CACHE_BYTES, ttl=SHARED_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self._entries = OrderedDict()   # key -> (owner, value, size, stored_at), oldest use first
+        self._inflight = {}             # key -> (owner, Future) of the load in progress
+        self._generations = {}          # owner -> number of invalidations
+        self._lock = threading.Lock()
+
+    # Value for `key`, loading it with fn(*args) on a miss. `owner` groups keys
+    # for invalidate and `size` gives a value's footprint in bytes.
+    def get(self, owner, key, size, fn, *args):
+        while True:
+            with self._lock:
+                hit = self._entries.get(key)
+                if hit is not None and time.monotonic() - hit[3] < self.ttl:
+                    self._entries.move_to_end(key)
+                    count(shared_cache_hits=1)
+                    return hit[1]
+                loading = key not in self._inflight
+                if loading:
+                    future = Future()
+                    self._inflight[key] = (owner, future)
+                    generation = self._generations.get(owner, 0)
+                else:
+                    future = self._inflight[key][1]
+            if loading:
+                return self._load(owner, key, size, future, generation, fn, args)
+            count(shared_cache_waits=1)
+            try:
+                with span("wait for shared load"):
+                    return future.result()
+            except FetchCancelled:
+                # The session that started the load moved on; load it here instead
+                continue
+
+    def _finish(self, key, future):
+        if self._inflight.get(key, (None, None))[1] is future:
+            del self._inflight[key]
+
+    def _load(self, owner, key, size, future, generation, fn, args):
+        try:
+            value = fn(*args)
+        except BaseException as exc:
+            with self._lock:
+                self._finish(key, future)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._finish(key, future)
+            if self._generations.get(owner, 0) == generation:
+                self._store(owner, key, value, size(value))
+        future.set_result(value)
+        return value
+
+    def _store(self, owner, key, value, nbytes):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (owner, value, nbytes, time.monotonic())
+        self.bytes += nbytes
+        now = time.monotonic()
+        for stale in [k for k, v in self._entries.items() if now - v[3] >= self.ttl]:
+            self.bytes -= self._entries.pop(stale)[2]
+        while self.bytes > self.max_bytes:
+            self.bytes -= self._entries.popitem(last=False)[1][2]
+
+    def invalidate(self, owner):
+        with self._lock:
+            self._generations[owner] = self._generations.get(owner, 0) + 1
+            for key in [k for k, v in self._entries.items() if v[0] == owner]:
+                self.bytes -= self._entries.pop(key)[2]
+            # Later callers start a fresh load instead of waiting on these
+            for key in [k for k, v in self._inflight.items() if v[0] == owner]:
+                del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "loading": len(self._inflight)}
+
+shared_entries = SharedCache()
+
+def _load_time_entries(start, end, user_id, api_token, account_id):
+    return get_time_entries(start, end, user_id, api_token, account_id).read_only()
+
+# Drop-in for entry_cache.get_time_entries shared by every session in the process
+def get_shared_time_entries(start, end, user_id, api_token, account_id):
+    return shared_entries.get(
+        _digest(account_id, user_id), _digest(account_id, user_id, start, end),
+        lambda entries: entries.nbytes,
+        _load_time_entries, start, end, user_id, api_token, account_id
+    )
+
+def invalidate_time_entries(user_id, account_id):
+    shared_entries.invalidate(_digest(account_id, user_id))
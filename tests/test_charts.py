@@ -0,0 +1,32 @@
+# Leap Time Tracker - tests/test_charts.py (LTTB downsampling)
+
+import numpy as np
+
+from charts import lttb
+
+def test_small_series_is_kept_whole():
+    x = np.arange(10.0)
+    assert lttb(x, x ** 2, 20).tolist() == list(range(10))
+    assert lttb(x, x ** 2, 2).tolist() == list(range(10))
+
+def test_keeps_endpoints_and_one_point_per_bucket():
+    rng = np.random.default_rng(1)
+    for n, threshold in [(100, 10), (1000, 97), (5000, 1000), (3, 3), (4, 3)]:
+        x = np.arange(n, dtype=float)
+        y = rng.normal(size=n).cumsum()
+        keep = lttb(x, y, threshold)
+        if threshold >= n:
+            assert keep.tolist() == list(range(n))
+            continue
+        assert len(keep) == threshold
+        assert keep[0] == 0 and keep[-1] == n - 1
+        assert np.all(np.diff(keep) > 0)
+        every = (n - 2) / (threshold - 2)
+        for i, k in enumerate(keep[1:-1]):
+            assert int(i * every) + 1 <= k < int((i + 1) * every) + 1
+
+def test_spike_survives():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[537] = 50.0
+    assert 537 in lttb(x, y, 50).tolist()
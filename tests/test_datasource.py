@@ -0,0 +1,76 @@
+# Leap Time Tracker - tests/test_datasource.py (balance source and report fallback against FakeHarvest)
+
+import datetime
+
+import pytest
+
+import harvest
+from benchmarks.fake_harvest import FakeHarvest
+from datasource import balance_hours, balance_source
+from entry_cache import get_time_entries
+
+TODAY = datetime.date.today()
+
+@pytest.fixture
+def fake(monkeypatch):
+    with FakeHarvest(history_days=3 * 365) as server:
+        monkeypatch.setattr(harvest, "API_URL", server.url)
+        harvest.reset_rate_limiters()
+        yield server
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "entries.sqlite")
+
+def days_ago(n):
+    return TODAY - datetime.timedelta(days=n)
+
+def hours(mode, path, start, end, **kwargs):
+    return balance_hours(mode, start, end, 1, "token", "account", path=path, **kwargs)
+
+def served_hours(fake, start, end):
+    return sum(e["hours"] for e in fake.entries if start.isoformat() <= e["spent_date"] <= end.isoformat())
+
+def test_range_over_several_years_sums_one_report_per_year(fake, path):
+    start = days_ago(800)
+    reported, denied = hours("reports", path, start, TODAY)
+    assert fake.report_requests == 3
+    assert reported == pytest.approx(served_hours(fake, start, TODAY))
+    assert not denied
+
+def test_refused_report_falls_back_and_is_not_asked_again(fake, path):
+    fake.report_status = 403
+    assert hours("reports", path, days_ago(30), TODAY) == (None, True)
+    fake.reset_counters()
+    assert hours("reports", path, days_ago(30), TODAY, reports_allowed=False) == (None, False)
+    assert fake.report_requests == 0
+
+def test_other_report_errors_fall_back_without_latching(fake, path):
+    fake.report_status = 500
+    assert hours("reports", path, days_ago(30), TODAY) == (None, False)
+
+def test_report_without_a_row_for_the_user_falls_back(fake, path):
+    fake.unreported_users = {1}
+    assert hours("reports", path, days_ago(30), TODAY) == (None, False)
+    assert fake.report_requests == 1
+
+def test_prefetched_entries_skip_the_report(fake, path):
+    assert hours("auto", path, days_ago(30), TODAY, prefetched=True) == (None, False)
+    assert fake.report_requests == 0
+    reported, _ = hours("auto", path, days_ago(30), TODAY)
+    assert reported == pytest.approx(served_hours(fake, days_ago(30), TODAY))
+
+def test_auto_counts_what_the_cache_already_covers(fake, path):
+    start = days_ago(3 * 365 - 1)
+
+    def source():
+        return balance_source("auto", start, TODAY, 1, "account", path=path)
+
+    # Three yearly reports against two pages of entries
+    assert source() == "entries"
+    # Extending a cached 60 days costs the sync plus two pages
+    get_time_entries(days_ago(59), TODAY, 1, "token", "account", path=path)
+    assert source() == "reports"
+    # Fully cached, only the sync is left
+    get_time_entries(start, TODAY, 1, "token", "account", path=path)
+    assert source() == "entries"
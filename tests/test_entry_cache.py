@@ -0,0 +1,87 @@
+# Leap Time Tracker - tests/test_entry_cache.py (incremental sync against FakeHarvest)
+
+import datetime
+import sqlite3
+
+import pytest
+
+import entry_cache
+import harvest
+from benchmarks.fake_harvest import FakeHarvest
+from entry_cache import get_time_entries
+
+TODAY = datetime.date.today()
+
+@pytest.fixture
+def fake(monkeypatch):
+    with FakeHarvest(history_days=60) as server:
+        monkeypatch.setattr(harvest, "API_URL", server.url)
+        harvest.reset_rate_limiters()
+        yield server
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "entries.sqlite")
+
+def days_ago(n):
+    return TODAY - datetime.timedelta(days=n)
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def load(path, start, end):
+    return get_time_entries(start, end, 1, "token", "account", path=path)
+
+def assert_matches_server(fake, path, start, end):
+    entries = load(path, start, end)
+    served = [e for e in fake.entries if start.isoformat() <= e["spent_date"] <= end.isoformat()]
+    assert sorted(entries.ids.tolist()) == sorted(e["id"] for e in served)
+    assert sorted(entries.hours.tolist()) == pytest.approx(sorted(e["hours"] for e in served))
+
+def edited(fake, entry_id, **changes):
+    return [dict(e, **changes, updated_at=now()) if e["id"] == entry_id else e for e in fake.entries]
+
+def test_edits_arrive_through_updated_since(fake, path):
+    start, end = days_ago(30), TODAY
+    assert_matches_server(fake, path, start, end)
+    target = next(e for e in fake.entries if e["spent_date"] >= start.isoformat())
+    fake.set_entries(edited(fake, target["id"], hours=11.0))
+    fake.reset_counters()
+    assert_matches_server(fake, path, start, end)
+    # The changed entries plus the deletion count check, no full refetch
+    assert fake.requests == 2
+
+def test_deleted_entries_are_detected(fake, path):
+    start, end = days_ago(30), TODAY
+    assert_matches_server(fake, path, start, end)
+    target = next(e for e in fake.entries if e["spent_date"] >= start.isoformat())
+    fake.set_entries([e for e in fake.entries if e["id"] != target["id"]])
+    assert_matches_server(fake, path, start, end)
+
+def test_entries_moved_out_of_the_range_are_dropped(fake, path):
+    start, end = days_ago(30), TODAY
+    assert_matches_server(fake, path, start, end)
+    target = next(e for e in fake.entries if e["spent_date"] >= start.isoformat())
+    fake.set_entries(edited(fake, target["id"], spent_date=days_ago(45).isoformat()))
+    assert_matches_server(fake, path, start, end)
+
+def test_range_extends_on_both_sides(fake, path):
+    assert_matches_server(fake, path, days_ago(20), days_ago(10))
+    assert_matches_server(fake, path, days_ago(50), TODAY)
+    assert entry_cache.cached_range(1, "account", path=path) == (days_ago(50), TODAY)
+    assert_matches_server(fake, path, days_ago(40), days_ago(5))
+
+def test_no_write_lock_is_held_while_fetching(fake, path, monkeypatch):
+    assert_matches_server(fake, path, days_ago(20), days_ago(10))
+    real_fetch = entry_cache.fetch_time_entries
+
+    def fetch_while_another_user_writes(*args, **kwargs):
+        # Another session writing at the same moment must not be locked out
+        with sqlite3.connect(path, timeout=0) as other:
+            other.execute("INSERT OR REPLACE INTO sync_state VALUES ('other', 2, '2024-01-01', '2024-01-02', 'x')")
+        return real_fetch(*args, **kwargs)
+
+    monkeypatch.setattr(entry_cache, "fetch_time_entries", fetch_while_another_user_writes)
+    target = next(e for e in fake.entries if e["spent_date"] >= days_ago(20).isoformat())
+    fake.set_entries([e for e in fake.entries if e["id"] != target["id"]])
+    assert_matches_server(fake, path, days_ago(50), TODAY)
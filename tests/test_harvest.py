@@ -0,0 +1,36 @@
+# Leap Time Tracker - tests/test_harvest.py (rate limiting)
+
+import threading
+import time
+
+from harvest import TokenBucket
+
+def test_token_bucket_stays_inside_the_limit_in_every_window():
+    # Harvest's 100 per 15 seconds, ten times faster
+    limit, per = 100, 1.5
+    bucket = TokenBucket(limit, per)
+    sent = []
+    lock = threading.Lock()
+    stop = time.monotonic() + 2.5 * per
+
+    def send():
+        while time.monotonic() < stop:
+            bucket.acquire()
+            with lock:
+                sent.append(time.monotonic())
+
+    threads = [threading.Thread(target=send) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sent.sort()
+    busiest = max(sum(1 for t in sent[i:] if t < start + per) for i, start in enumerate(sent))
+    assert limit * 0.9 <= busiest <= limit
+
+def test_pause_blocks_until_retry_after():
+    bucket = TokenBucket(100, 15.0)
+    bucket.pause(0.2)
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.19
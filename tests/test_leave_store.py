@@ -0,0 +1,56 @@
+# Leap Time Tracker - tests/test_leave_store.py (LeaveStore against a set model)
+
+import datetime
+import random
+
+import numpy as np
+
+from leave_store import LeaveStore
+
+BASE = datetime.date(2024, 1, 1)
+
+def day(offset):
+    return BASE + datetime.timedelta(days=offset)
+
+def check(store, model):
+    for reason, ivs in store.intervals.items():
+        assert ivs, reason
+        for (s1, e1), (s2, e2) in zip(ivs, ivs[1:]):
+            # Sorted, disjoint and not touching, so no day is counted twice
+            assert e1 + 1 < s2
+        assert all(s <= e for s, e in ivs)
+        days = {d for s, e in ivs for d in range(s, e + 1)}
+        assert days == {d.toordinal() for d in model[reason]}
+    assert set(store.intervals) == {r for r, days in model.items() if days}
+    dates = np.arange(np.datetime64(day(-5)), np.datetime64(day(70)))
+    everything = set().union(*model.values())
+    expected = [d.astype(object) in everything for d in dates]
+    assert store.mask(dates).tolist() == expected
+
+def test_random_add_remove_matches_set_model():
+    rng = random.Random(4)
+    for _ in range(200):
+        store = LeaveStore()
+        model = {}
+        for _ in range(30):
+            reason = rng.choice(["Holiday", "Sick", ""]) or "(No description)"
+            start = day(rng.randrange(60))
+            end = start + datetime.timedelta(days=rng.randrange(-3, 8))
+            span = {start + datetime.timedelta(days=i) for i in range((end - start).days + 1)}
+            if rng.random() < 0.6:
+                added = store.add(start, end, reason)
+                assert added == len(span - model.get(reason, set()))
+                model.setdefault(reason, set()).update(span)
+            else:
+                store.remove(start, end, reason)
+                model.setdefault(reason, set()).difference_update(span)
+            check(store, model)
+
+def test_reversed_range_is_ignored():
+    store = LeaveStore()
+    store.add(day(57), day(63), "Holiday")
+    version = store.version
+    store.remove(day(60), day(58), "Holiday")
+    assert store.intervals["Holiday"] == [(day(57).toordinal(), day(63).toordinal())]
+    assert store.add(day(60), day(58), "Holiday") == 0
+    assert store.version == version
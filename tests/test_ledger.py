@@ -0,0 +1,59 @@
+# Leap Time Tracker - tests/test_ledger.py (LedgerIndex against build_ledger)
+
+import datetime
+import random
+
+import numpy as np
+
+from entry_columns import TimeEntryColumns, day_number
+from leave_store import LeaveStore
+from ledger import WEEKDAYS, LedgerIndex, balance_summary, build_ledger
+
+START = datetime.date(2023, 1, 1)
+END = datetime.date(2024, 12, 31)
+
+def random_entries(rng):
+    n = 600
+    days = [day_number(START) + rng.randrange((END - START).days + 1) for _ in range(n)]
+    return TimeEntryColumns(np.arange(n, dtype=np.int64), np.array(days, np.int32),
+                            np.array([rng.choice([0.5, 1.0, 3.75, 7.5]) for _ in range(n)], np.float32))
+
+def random_range(rng):
+    a = START + datetime.timedelta(days=rng.randrange(-20, (END - START).days + 20))
+    return a, a + datetime.timedelta(days=rng.randrange(0, 120))
+
+# The index clips ranges to its history, so compare with the clipped ledger
+def assert_matches(index, holidays, entries, daily_hours, start, end):
+    lo, hi = max(start, START), min(end, END)
+    if lo > hi:
+        return
+    expected = balance_summary(build_ledger(lo, hi, daily_hours, holidays, entries))
+    got = index.summary(start, end, daily_hours)
+    for key in expected:
+        assert abs(got[key] - expected[key]) < 1e-6, (key, start, end)
+
+def test_summary_and_update_leave_match_ledger():
+    rng = random.Random(12)
+    entries = random_entries(rng)
+    holidays = LeaveStore()
+    index = LedgerIndex(START, END, holidays, entries)
+    for _ in range(150):
+        daily_hours = {day: rng.choice([0.0, 4.0, 7.5]) for day in WEEKDAYS}
+        start, end = random_range(rng)
+        if rng.random() < 0.5:
+            holidays.add(start, end, rng.choice(["Holiday", "Sick"]))
+        else:
+            holidays.remove(start, end, rng.choice(["Holiday", "Sick"]))
+        index.update_leave(holidays, start, end)
+        assert index.leave_mask.tolist() == holidays.mask(index.dates).tolist()
+        for _ in range(3):
+            assert_matches(index, holidays, entries, daily_hours, *random_range(rng))
+
+def test_totals_have_no_float32_noise():
+    day = day_number(START)
+    entries = TimeEntryColumns(np.array([1, 2], np.int64), np.array([day, day], np.int32),
+                               np.array([7.33, 1.1], np.float32))
+    daily_hours = {name: 7.5 for name in WEEKDAYS}
+    summary = balance_summary(build_ledger(START, START, daily_hours, LeaveStore(), entries))
+    assert summary["logged"] == 8.43
+    assert LedgerIndex(START, START, LeaveStore(), entries).summary(START, START, daily_hours)["logged"] == 8.43
@@ -0,0 +1,108 @@
+# Leap Time Tracker - tests/test_shared_cache.py (SharedCache eviction and coalescing)
+
+import threading
+import time
+
+import pytest
+
+from harvest import FetchCancelled
+from shared_cache import SharedCache
+
+def one_byte(value):
+    return 1
+
+def test_concurrent_callers_share_one_load():
+    cache = SharedCache()
+    calls = []
+    release = threading.Event()
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("o", "k", one_byte, load)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    assert cache.get("o", "k", one_byte, object) is results[0]
+
+def test_least_recently_used_is_evicted_first():
+    cache = SharedCache(max_bytes=100)
+    for key in "abc":
+        cache.get("o", key, lambda v: 40, lambda key=key: key)
+    assert list(cache._entries) == ["b", "c"]
+    cache.get("o", "b", lambda v: 40, lambda: "reloaded")
+    cache.get("o", "d", lambda v: 40, lambda: "d")
+    assert list(cache._entries) == ["b", "d"]
+    cache.get("o", "huge", lambda v: 1000, lambda: "huge")
+    assert "huge" not in cache._entries and cache.stats()["bytes"] == 80
+
+def test_entries_expire():
+    cache = SharedCache(ttl=0.05)
+    loads = []
+    load = lambda: loads.append(1) or len(loads)
+    assert cache.get("o", "k", one_byte, load) == 1
+    assert cache.get("o", "k", one_byte, load) == 1
+    time.sleep(0.06)
+    assert cache.get("o", "k", one_byte, load) == 2
+
+def test_failures_are_not_cached():
+    cache = SharedCache()
+    with pytest.raises(ZeroDivisionError):
+        cache.get("o", "k", one_byte, lambda: 1 / 0)
+    assert cache.get("o", "k", one_byte, lambda: "ok") == "ok"
+
+def test_waiter_reloads_when_the_first_load_is_cancelled():
+    cache = SharedCache()
+    started, release = threading.Event(), threading.Event()
+
+    def cancelled_load():
+        started.set()
+        release.wait(5)
+        raise FetchCancelled("moved on")
+
+    def first():
+        with pytest.raises(FetchCancelled):
+            cache.get("o", "k", one_byte, cancelled_load)
+
+    results = []
+    t1 = threading.Thread(target=first)
+    t1.start()
+    started.wait(5)
+    t2 = threading.Thread(target=lambda: results.append(cache.get("o", "k", one_byte, lambda: "fresh")))
+    t2.start()
+    time.sleep(0.05)
+    release.set()
+    t1.join()
+    t2.join()
+    assert results == ["fresh"]
+
+def test_load_started_before_invalidate_is_not_stored():
+    cache = SharedCache()
+    started, release = threading.Event(), threading.Event()
+
+    def stale_load():
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    results = []
+    t = threading.Thread(target=lambda: results.append(cache.get("o", "k", one_byte, stale_load)))
+    t.start()
+    started.wait(5)
+    cache.invalidate("o")
+    # A caller after the invalidate does not wait on the old load
+    assert cache.get("o", "k", one_byte, lambda: "fresh") == "fresh"
+    release.set()
+    t.join()
+    assert results == ["stale"]
+    assert cache.get("o", "k", one_byte, lambda: "other") == "fresh"
+    assert cache.stats()["loading"] == 0